@@ -1,15 +1,20 @@
 # triage_agent.py
 from __future__ import annotations
 
-import json
+import asyncio
+import itertools
 import os
-from typing import Any, Dict, List, Optional
+import re
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+import orjson
 
 # LLM (usamos direto o SDK; se preferir, pode trocar pelo seu wrapper em llm.py)
 try:
-    from openai import OpenAI  # pip install openai
+    from openai import AsyncOpenAI, OpenAI  # pip install openai
 except Exception:
-    OpenAI = None  # type: ignore
+    AsyncOpenAI = OpenAI = None  # type: ignore
 
 from ..kb import search as kb_search, kb_try_answer
 from ..summarizer import extract_steps
@@ -29,6 +34,8 @@ except Exception:
 _OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "").strip()
 _LLM_MODEL = os.getenv("LLM_MODEL", "gpt-4o-mini")
 _CLIENT = OpenAI(api_key=_OPENAI_API_KEY) if (_OPENAI_API_KEY and OpenAI) else None
+# Cliente assíncrono para a chamada final da triagem (atriage_next) sem prender a thread do loop
+_ACLIENT = AsyncOpenAI(api_key=_OPENAI_API_KEY) if (_OPENAI_API_KEY and AsyncOpenAI) else None
 
 # ---- Intents suportadas (podemos expandir sem quebrar) ----
 INTENT_DESCRIPTIONS = {
@@ -80,6 +87,9 @@ Formato de resposta (JSON):
 # Utilitários de contexto
 # --------------------------------------------------------------------------------------
 
+_CTX_TBL = str.maketrans({"\r": " ", "\n": " "})
+
+
 def _ticket_context(ticket: Dict[str, Any]) -> str:
     subj = (ticket.get("subject") or "").strip()
     body = (
@@ -88,15 +98,16 @@ def _ticket_context(ticket: Dict[str, Any]) -> str:
         or ticket.get("description")
         or ""
     ).strip()
-    body = body.replace("\r", " ").replace("\n", " ")
-    if len(body) > 1500:
-        body = body[:1500] + "..."
+    # corta antes de traduzir: o custo fica limitado a 1500 chars, por maior que seja o corpo
+    body = body[:1500].translate(_CTX_TBL) + ("..." if len(body) > 1500 else "")
     return f"Ticket #{ticket.get('id')}\nAssunto: {subj or '(sem assunto)'}\nPrimeira mensagem: {body or '(sem corpo)'}"
 
 
-def _history_as_msgs(history: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+def _history_as_msgs(history: List[Dict[str, Any]], max_turns: int = 20) -> List[Dict[str, str]]:
+    """Últimas max_turns mensagens do histórico (as mais antigas saem do prompt)."""
+    recent = list(itertools.islice(reversed(history or []), max_turns))[::-1]
     msgs: List[Dict[str, str]] = []
-    for m in history or []:
+    for m in recent:
         role = "assistant" if (m.get("role") == "assistant") else "user"
         txt = m.get("text")
         if not isinstance(txt, str):
@@ -112,14 +123,17 @@ def _history_as_msgs(history: List[Dict[str, Any]]) -> List[Dict[str, str]]:
 
 def _safe_json_loads(s: str) -> Dict[str, Any]:
     try:
-        return json.loads(s)
-    except Exception:
-        return {
-            "action": "ask",
-            "message": "Quero te ajudar certinho! Em qual tela ou etapa você está agora?",
-            "checklist": [],
-            "confidence": 0.4,
-        }
+        data = orjson.loads(s)
+    except orjson.JSONDecodeError:
+        data = None
+    if isinstance(data, dict):
+        return data
+    return {
+        "action": "ask",
+        "message": "Quero te ajudar certinho! Em qual tela ou etapa você está agora?",
+        "checklist": [],
+        "confidence": 0.4,
+    }
 
 
 _GREETINGS = ("oi", "olá", "ola", "bom dia", "boa tarde", "boa noite", "hey", "hi", "hello")
@@ -141,47 +155,67 @@ def _is_greeting(text: str) -> bool:
 # Classificação de intenção
 # --------------------------------------------------------------------------------------
 
+def _any_of(*needles: str) -> re.Pattern[str]:
+    """Alternação pré-compilada equivalente a `any(n in texto for n in needles)`."""
+    return re.compile("|".join(re.escape(n) for n in needles if n))
+
+
+# Grupos de palavras-chave da heurística (texto já em minúsculas; casamento por substring)
+_KW_EMAIL = _any_of("e-mail", "email", "mailbox", "outlook")
+_KW_BLOCKED = _any_of("bloque", "suspens", "licenc", "mfa", "autenticação", "conta desativada")
+_KW_SIGNATURE = _any_of("assinatura")
+_KW_SIG_GENERATE = _any_of("criar", "gerar", "png", "imagem")
+_KW_SIG_CONFIGURE = _any_of("configurar", "outlook", "opções", "options", "novo", "clássico")
+_KW_PASSWORD = _any_of("reset", "redefinir", "esqueci", "senha", "password")
+_KW_ONEDRIVE = _any_of("onedrive", "one drive", "sharepoint")
+_KW_SYNC = _any_of("sincron", "sync", "pendente", "travado", "ícone amarelo", "status amarelo", "upload", "arquivos em espera")
+_KW_PERMISSION = _any_of("permiss", "acesso", "compartilh", "liberar", "site", "biblioteca")
+_KW_PRINTER = _any_of("impressora", "printer", "multifuncional")
+_KW_PRINTER_INSTALL = _any_of("instal", "driver", "deploy", "mapear", "adicionar", "instalar impressora")
+_KW_PRINTER_QUEUE = _any_of("fila", "spool", "trav", "spooler", "limpar fila", "cancelar fila", "fila presa", "reiniciar spool")
+_KW_INTERNAL = _any_of("erp", "crm", "protheus", "sap", "totvs", "sisloc", "salesforce", "dynamics", "sistema interno", "sistema corporativo")
+_KW_VPN = _any_of("vpn")
+_KW_DELIVERY = _any_of("não envia", "nao envia", "não recebe", "nao recebe", "retorna", "bounce", "caixa de saída", "caixa de saida", "outbox", "fila")
+
+
 def _classify_intent_heuristic(text: str) -> Dict[str, Any]:
     """Fallback leve em PT-BR quando não houver LLM."""
     t = (text or "").lower()
 
-    def has_any(*needles: str) -> bool:
-        return any(n in t for n in needles if n)
+    email_context = bool(_KW_EMAIL.search(t))
+    email_blocked = email_context and bool(_KW_BLOCKED.search(t))
 
-    email_context = has_any("e-mail", "email", "mailbox", "outlook")
-    email_blocked = email_context and has_any("bloque", "suspens", "licenc", "mfa", "autenticação", "conta desativada")
-
-    if "assinatura" in t and has_any("criar", "gerar", "png", "imagem"):
+    if _KW_SIGNATURE.search(t) and _KW_SIG_GENERATE.search(t):
         return {"intent": "signature.generate", "confidence": 0.65}
-    if "assinatura" in t and has_any("configurar", "outlook", "opções", "options", "novo", "clássico"):
+    if _KW_SIGNATURE.search(t) and _KW_SIG_CONFIGURE.search(t):
         return {"intent": "signature.configure", "confidence": 0.6}
-    if has_any("reset", "redefinir", "esqueci", "senha", "password"):
+    if _KW_PASSWORD.search(t):
         if email_blocked:
             return {"intent": "email.access_blocked", "confidence": 0.6}
         return {"intent": "password.reset", "confidence": 0.6}
 
-    if has_any("onedrive", "one drive", "sharepoint"):
-        if has_any("sincron", "sync", "pendente", "travado", "ícone amarelo", "status amarelo", "upload", "arquivos em espera"):
+    if _KW_ONEDRIVE.search(t):
+        if _KW_SYNC.search(t):
             return {"intent": "onedrive.sync_issue", "confidence": 0.62}
-        if has_any("permiss", "acesso", "compartilh", "liberar", "site", "biblioteca"):
+        if _KW_PERMISSION.search(t):
             return {"intent": "sharepoint.permission_issue", "confidence": 0.58}
 
-    if has_any("impressora", "printer", "multifuncional"):
-        if has_any("instal", "driver", "deploy", "mapear", "adicionar", "instalar impressora"):
+    if _KW_PRINTER.search(t):
+        if _KW_PRINTER_INSTALL.search(t):
             return {"intent": "printer.install_driver", "confidence": 0.6}
-        if has_any("fila", "spool", "trav", "spooler", "limpar fila", "cancelar fila", "fila presa", "reiniciar spool"):
+        if _KW_PRINTER_QUEUE.search(t):
             return {"intent": "printer.queue_stuck", "confidence": 0.58}
 
-    if has_any("erp", "crm", "protheus", "sap", "totvs", "sisloc", "salesforce", "dynamics", "sistema interno", "sistema corporativo"):
+    if _KW_INTERNAL.search(t):
         return {"intent": "internal_system.access", "confidence": 0.6}
 
-    if has_any("vpn"):
+    if _KW_VPN.search(t):
         return {"intent": "vpn.access", "confidence": 0.55}
 
     if email_context:
         if email_blocked:
             return {"intent": "email.access_blocked", "confidence": 0.58}
-        if has_any("não envia", "nao envia", "não recebe", "nao recebe", "retorna", "bounce", "caixa de saída", "caixa de saida", "outbox", "fila"):
+        if _KW_DELIVERY.search(t):
             return {"intent": "email.delivery_issue", "confidence": 0.55}
         return {"intent": "outlook.issue", "confidence": 0.5}
 
@@ -226,6 +260,21 @@ def classify_intent(text: str) -> Dict[str, Any]:
         return _classify_intent_heuristic(text)
 
 
+# --------------------------------------------------------------------------------------
+# Resumo curto de chunk (até 3 passos ou os primeiros caracteres)
+# --------------------------------------------------------------------------------------
+
+@lru_cache(maxsize=2048)
+def _chunk_short(chunk: str, limit: int) -> str:
+    """
+    Os chunks da KB são estáticos e voltam nos mesmos hits a cada turno: memoizamos
+    pelo próprio texto, então uma reindexação com conteúdo novo gera chaves novas.
+    """
+    chunk = chunk.strip()
+    steps = extract_steps(chunk, max_steps=3)
+    return " | ".join(steps) if steps else (chunk[:limit] + ("..." if len(chunk) > limit else ""))
+
+
 # --------------------------------------------------------------------------------------
 # Reranking com LLM
 # --------------------------------------------------------------------------------------
@@ -242,9 +291,7 @@ def rerank_with_llm(query: str, hits: List[Dict[str, Any]]) -> List[Dict[str, An
     cand_lines = []
     for i, h in enumerate(hits):
         title = h.get("doc_title") or "Documento"
-        chunk = (h.get("chunk_text") or "").strip()
-        steps = extract_steps(chunk, max_steps=3)
-        short = " | ".join(steps) if steps else (chunk[:220] + ("..." if len(chunk) > 220 else ""))
+        short = _chunk_short(h.get("chunk_text") or "", 220)
         cand_lines.append(f"[{i}] {title}: {short}")
 
     prompt = (
@@ -289,9 +336,7 @@ def _kb_context_from_hits(hits: List[Dict[str, Any]], k: int) -> str:
     lines = ["KB (resumos curtos):"]
     for i, h in enumerate(hits[:k], start=1):
         title = h.get("doc_title") or "Documento"
-        chunk = (h.get("chunk_text") or "").strip()
-        steps = extract_steps(chunk, max_steps=3)
-        short = " | ".join(steps) if steps else (chunk[:280] + ("..." if len(chunk) > 280 else ""))
+        short = _chunk_short(h.get("chunk_text") or "", 280)
         lines.append(f"[{i}] {title}: {short}")
     return "\n".join(lines)
 
@@ -300,89 +345,77 @@ def _kb_context_from_hits(hits: List[Dict[str, Any]], k: int) -> str:
 # Função principal do agente
 # --------------------------------------------------------------------------------------
 
-def triage_next(history: List[Dict[str, Any]], ticket: Dict[str, Any]) -> Dict[str, Any]:
-    """
-    Decide o próximo passo usando: Classificação de intenção → KB (BM25 + priors) → Reranker LLM → LLM para resposta.
-    Retorno mantém contrato atual e adiciona best_doc_path para feedback posterior.
-    """
-    # 1) Query canônica com contexto do ticket
+def _triage_query(history: List[Dict[str, Any]], ticket: Dict[str, Any]) -> Tuple[str, str]:
+    """Query canônica (assunto + primeira mensagem + última fala do usuário) e a última fala."""
     last_user = next((m.get("text") for m in reversed(history or []) if m.get("role") == "user"), "")
     query = f"{ticket.get('subject','')}\n{ticket.get('first_action_text') or ticket.get('description') or ''}\n{last_user}".strip()
-
-    # 2) Classificar intenção
-    intent_data = classify_intent(query)
-    intent = intent_data.get("intent") or "other"
-
-    # 3) Priors (aprendizado com feedback)
-    priors = get_priors(intent=intent)
-
-    # 4) Buscar na KB com priors (Top-K maior para reranking)
-    topk = max(3, int(_KB_TOP_K_DEFAULT) * 3)
-    threshold = float(_KB_MIN_SCORE_DEFAULT or 2.0)
-    hits = kb_search(query, k=topk, threshold=threshold, priors=priors)
-
-    # 5) Se nada relevante → perguntar 1 detalhe
-    if not hits:
-        last_user_msg = (last_user or "").strip()
-        if _is_greeting(last_user_msg):
-            message = "Oi! Que bom falar com você. Me conta rapidinho o que está acontecendo e eu te ajudo."
-        else:
-            detail = ""
-            if ticket.get("subject"):
-                detail = f" sobre \"{ticket['subject'][:80]}\""
-            message = f"Quero te ajudar com isso{detail}. Pode me explicar melhor o que está acontecendo?"
-        return {
-            "action": "ask",
-            "message": message,
-            "checklist": [],
-            "confidence": 0.45,
-        }
-
-    # 6) Reranking com LLM (melhor primeiro)
-    hits = rerank_with_llm(query, hits)
-
-    # 7) Preparar contexto de KB enxuto (título + steps)
-    kb_ctx = _kb_context_from_hits(hits, k=max(2, _KB_TOP_K_DEFAULT))
-
-    # 8) Sem LLM → fallback curto usando a própria KB
-    if not _CLIENT:
-        best = hits[0]
-        fallback = kb_try_answer(query, threshold=threshold, priors=priors)
-        if fallback:
-            return {
-                "action": "answer",
-                "message": fallback["reply"],
-                "checklist": [s["title"] for s in fallback.get("sources", [])],
-                "confidence": 0.55,
-                "best_doc_path": best.get("doc_path"),
-                "intent": intent,
-            }
-        # improvável (já temos hits), mas por segurança:
+    return query, last_user
+
+
+def _triage_params() -> Tuple[int, float]:
+    """Top-K maior para o reranking e limiar mínimo de score da KB."""
+    return max(3, int(_KB_TOP_K_DEFAULT) * 3), float(_KB_MIN_SCORE_DEFAULT or 2.0)
+
+
+def _no_hits_reply(last_user: str, ticket: Dict[str, Any]) -> Dict[str, Any]:
+    """Nada relevante na KB → perguntar 1 detalhe."""
+    last_user_msg = (last_user or "").strip()
+    if _is_greeting(last_user_msg):
+        message = "Oi! Que bom falar com você. Me conta rapidinho o que está acontecendo e eu te ajudo."
+    else:
+        detail = ""
+        if ticket.get("subject"):
+            detail = f" sobre \"{ticket['subject'][:80]}\""
+        message = f"Quero te ajudar com isso{detail}. Pode me explicar melhor o que está acontecendo?"
+    return {
+        "action": "ask",
+        "message": message,
+        "checklist": [],
+        "confidence": 0.45,
+    }
+
+
+def _kb_fallback_reply(
+    fallback: Optional[Dict[str, Any]], hits: List[Dict[str, Any]], kb_ctx: str, intent: str
+) -> Dict[str, Any]:
+    """Sem LLM → resposta curta usando a própria KB."""
+    if fallback:
         return {
             "action": "answer",
-            "message": kb_ctx + "\n\nMe diga em qual tela você está agora que eu te guio o próximo passo.",
-            "checklist": [],
-            "confidence": 0.5,
+            "message": fallback["reply"],
+            "checklist": [s["title"] for s in fallback.get("sources", [])],
+            "confidence": 0.55,
             "best_doc_path": hits[0].get("doc_path"),
             "intent": intent,
         }
-
-    # 9) Gerar resposta curta com LLM usando o contexto + histórico
+    # improvável (já temos hits), mas por segurança:
+    return {
+        "action": "answer",
+        "message": kb_ctx + "\n\nMe diga em qual tela você está agora que eu te guio o próximo passo.",
+        "checklist": [],
+        "confidence": 0.5,
+        "best_doc_path": hits[0].get("doc_path"),
+        "intent": intent,
+    }
+
+
+def _triage_msgs(
+    history: List[Dict[str, Any]], ticket: Dict[str, Any], intent: str, kb_ctx: str
+) -> List[Dict[str, str]]:
+    """
+    Mensagens para o LLM: system, ticket, intent + KB e só então o histórico,
+    para que a última fala do usuário feche o prompt.
+    """
     msgs: List[Dict[str, str]] = []
     msgs.append({"role": "system", "content": SYSTEM_PROMPT})
     msgs.append({"role": "user", "content": _ticket_context(ticket)})
     msgs.append({"role": "user", "content": f"Intent detectada: {intent} (use este objetivo)."})
     msgs.append({"role": "user", "content": kb_ctx})
     msgs.extend(_history_as_msgs(history))
+    return msgs
 
-    resp = _CLIENT.chat.completions.create(
-        model=_LLM_MODEL,
-        messages=msgs,
-        temperature=0.2,
-        max_tokens=600,
-        response_format={"type": "json_object"},
-    )
-    content = resp.choices[0].message.content or "{}"
+
+def _finish_llm_reply(content: str, hits: List[Dict[str, Any]], intent: str) -> Dict[str, Any]:
     data = _safe_json_loads(content)
 
     # saneamento e metadados para feedback
@@ -395,6 +428,63 @@ def triage_next(history: List[Dict[str, Any]], ticket: Dict[str, Any]) -> Dict[s
     return data
 
 
+async def _akb_hits_and_context(
+    query: str, topk: int, threshold: float, priors: Dict[str, float]
+) -> Tuple[List[Dict[str, Any]], str]:
+    """Busca na KB + reranking + contexto enxuto, fora da thread do loop."""
+    hits = await asyncio.to_thread(kb_search, query, k=topk, threshold=threshold, priors=priors)
+    if not hits:
+        return [], ""
+    hits = await asyncio.to_thread(rerank_with_llm, query, hits)
+    return hits, _kb_context_from_hits(hits, k=max(2, _KB_TOP_K_DEFAULT))
+
+
+async def atriage_next(history: List[Dict[str, Any]], ticket: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Decide o próximo passo usando: Classificação de intenção → KB (BM25 + priors) → Reranker LLM → LLM para resposta.
+    Retorno mantém contrato atual e adiciona best_doc_path para feedback posterior.
+    As etapas bloqueantes rodam em threads (fora do loop), uma após a outra, e a
+    chamada final usa o cliente AsyncOpenAI.
+    """
+    # 1) Query canônica com contexto do ticket
+    query, last_user = _triage_query(history, ticket)
+
+    # 2) Classificar intenção
+    intent_data = await asyncio.to_thread(classify_intent, query)
+    intent = intent_data.get("intent") or "other"
+
+    # 3) Priors (aprendizado com feedback)
+    priors = await asyncio.to_thread(get_priors, intent=intent)
+
+    # 4) Buscar na KB com priors (Top-K maior) + reranking LLM + contexto enxuto
+    topk, threshold = _triage_params()
+    hits, kb_ctx = await _akb_hits_and_context(query, topk, threshold, priors)
+
+    # 5) Se nada relevante → perguntar 1 detalhe
+    if not hits:
+        return _no_hits_reply(last_user, ticket)
+
+    # 6) Sem LLM → fallback curto usando a própria KB
+    if not _CLIENT:
+        fallback = await asyncio.to_thread(kb_try_answer, query, threshold=threshold, priors=priors)
+        return _kb_fallback_reply(fallback, hits, kb_ctx, intent)
+
+    # 7) Gerar resposta curta com LLM usando o contexto + histórico
+    msgs = _triage_msgs(history, ticket, intent, kb_ctx)
+    params = dict(
+        model=_LLM_MODEL,
+        messages=msgs,
+        temperature=0.2,
+        max_tokens=600,
+        response_format={"type": "json_object"},
+    )
+    if _ACLIENT is not None:
+        resp = await _ACLIENT.chat.completions.create(**params)
+    else:
+        resp = await asyncio.to_thread(_CLIENT.chat.completions.create, **params)
+    return _finish_llm_reply(resp.choices[0].message.content or "{}", hits, intent)
+
+
 def ia_generate_message(prompt: str, temperature: float = 0.4, max_tokens: int = 240) -> str:
     """
     Mensagem auxiliar para gerar a primeira fala do bot via LLM.
@@ -16,7 +16,7 @@ from loguru import logger
 
 from .movidesk_client import get_ticket_text_bundle
 from .kb import kb_try_answer
-from .ai.triage_agent import triage_next  # agente com intenção + priors + reranker
+from .ai.triage_agent import atriage_next  # agente com intenção + priors + reranker
 from .learning import record_feedback, get_priors  # feedback preditivo
 from .ai.prompt_builder import build_initial_prompt
 from .db import (
@@ -92,7 +92,7 @@ class N1Bot(ActivityHandler):
       - comando 'iniciar <ticket>'
       - confirma sempre com "Funcionou? Sim/Não", e encerra/escala conforme resposta
       - limite de 25 mensagens do agente por conversa
-      - usa IA (triage_next) + KB como apoio quando fizer sentido
+      - usa IA (atriage_next) + KB como apoio quando fizer sentido
       - registra feedback de sucesso/fracasso para aprendizado contínuo
 
     Evolução (multi-ticket):
@@ -182,9 +182,9 @@ class N1Bot(ActivityHandler):
             hist.append({"role": "user", "text": extra_hint})
 
         try:
-            out = triage_next(hist, ticket_ctx)
+            out = await atriage_next(hist, ticket_ctx)
         except Exception as e:
-            logger.exception(f"[BOT] triage_next falhou: {e}")
+            logger.exception(f"[BOT] atriage_next falhou: {e}")
             out = {
                 "action": "ask",
                 "message": "Certo! Em qual tela/opção você está agora? Posso te guiar o próximo passo.",
@@ -3,6 +3,13 @@ import os
 
 load_dotenv()
 
+# HTTP/2 nos clientes httpx só se o extra estiver instalado (pip install "httpx[http2]")
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except Exception:
+    HTTP2_AVAILABLE = False
+
 class Settings:
     WEBHOOK_SHARED_SECRET: str = os.getenv("WEBHOOK_SHARED_SECRET", "")
     MOVIDESK_TOKEN: str = os.getenv("MOVIDESK_TOKEN", "")
@@ -42,9 +42,14 @@ def _utc_now() -> str:
     return datetime.now(timezone.utc).isoformat()
 
 
+def _is_uri(path: str) -> bool:
+    # "file:nome?mode=memory&cache=shared" (testes) → banco em memória compartilhado entre conexões
+    return path.startswith("file:")
+
+
 @contextmanager
 def connect():
-    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False, uri=_is_uri(DB_PATH))
     try:
         yield conn
     finally:
@@ -168,8 +173,9 @@ def _ensure_sessions_table(cur: sqlite3.Cursor):
 
 
 def init_db():
-    Path(DB_PATH).parent.mkdir(parents=True, exist_ok=True)
-    with sqlite3.connect(DB_PATH) as conn:
+    if not _is_uri(DB_PATH):
+        Path(DB_PATH).parent.mkdir(parents=True, exist_ok=True)
+    with sqlite3.connect(DB_PATH, uri=_is_uri(DB_PATH)) as conn:
         cur = conn.cursor()
         cur.execute(
             """
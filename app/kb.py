@@ -4,6 +4,7 @@ from __future__ import annotations
 import json
 import math
 import re
+import threading
 import unicodedata
 from pathlib import Path
 from typing import Any, Dict, Iterable, List, Tuple
@@ -17,6 +18,8 @@ except Exception:  # fallback simples
         def error(self, *a, **k): print("[ERROR]", *a)
     logger = _L()  # type: ignore
 
+from .ttl_cache import TTLCache
+
 # Diretórios/arquivos
 KB_DIR = Path(__file__).parent / "knowledge"
 KB_INDEX = Path(__file__).parent / "kb_index.json"
@@ -38,6 +41,16 @@ _AVGDL: float = 1.0
 _DOC_BY_ID: Dict[int, Dict[str, Any]] = {}
 _SYN_INDEX: Dict[str, set] = {}           # token -> {sinônimos}
 
+# A indexação não roda no import (que não deve ler a KB nem gravar KB_INDEX): acontece
+# no startup da aplicação ou, no mais tardar, na primeira busca (ensure_index).
+_INDEX_LOCK = threading.Lock()
+_INDEXED = False
+
+# Versão do índice: incrementada a cada reindexação. Entra na chave do cache de busca,
+# então resultados valem enquanto a KB não muda e caem sozinhos quando ela muda.
+KB_VERSION = 0
+_SEARCH_CACHE: TTLCache[List[Dict[str, Any]]] = TTLCache(ttl=None, maxsize=1024)
+
 # --------------------------------------------------------------------------------------
 # Utils
 # --------------------------------------------------------------------------------------
@@ -107,23 +120,72 @@ def _ensure_kb_dir():
 # Indexação
 # --------------------------------------------------------------------------------------
 
-def _build_index() -> None:
-    global _DOCS, _CHUNKS, _IDF, _AVGDL, _DOC_BY_ID, _SYN_INDEX
+# Documentos já lidos/tokenizados: path -> ((mtime_ns, tamanho), doc parseado).
+# reindex() só relê os arquivos cuja assinatura mudou; IDF/AVGDL são sempre recalculados.
+_PARSED: Dict[str, Tuple[Tuple[int, int], Dict[str, Any]]] = {}
+
+def _parse_doc(path: Path) -> Dict[str, Any]:
+    raw = path.read_text(encoding="utf-8", errors="ignore")
+    meta, body = _parse_frontmatter(raw)
+    title = meta.get("title") or path.stem.replace("_", " ").title()
+    tags: List[str] = meta.get("tags") or []
+    syns: List[str] = meta.get("synonyms") or []
+
+    # tokens de meta (para boosts)
+    title_tokens = _tokenize(title)
+    tag_tokens: List[str] = []
+    for t in tags:
+        tag_tokens.extend(_tokenize(t))
+    syn_tokens: List[str] = []
+    for s in syns:
+        syn_tokens.extend(_tokenize(s))
+
+    # chunking
+    chunks: List[Tuple[str, Dict[str, int]]] = []
+    for ch_text in _split_chunks(body):
+        tokens = _tokenize(ch_text)
+        tf: Dict[str, int] = {}
+        for t in tokens:
+            tf[t] = tf.get(t, 0) + 1
+
+        # boosts de meta
+        for t in title_tokens:
+            tf[t] = tf.get(t, 0) + TITLE_BOOST
+        for t in tag_tokens:
+            tf[t] = tf.get(t, 0) + TAGS_BOOST
+        for t in syn_tokens:
+            tf[t] = tf.get(t, 0) + SYN_BOOST
+        chunks.append((ch_text, tf))
+
+    return {"title": title, "tags": tags, "synonyms": syns, "text": body, "chunks": chunks}
+
+def _build_index() -> int:
+    """Reconstrói o índice em memória; devolve quantos arquivos precisaram ser relidos."""
+    global _DOCS, _CHUNKS, _IDF, _AVGDL, _DOC_BY_ID, _SYN_INDEX, KB_VERSION
     _DOCS, _CHUNKS = [], []
     _DOC_BY_ID, _SYN_INDEX = {}, {}
     next_doc_id, next_chunk_id = 0, 0
+    reparsed = 0
 
     _ensure_kb_dir()
 
+    seen: set = set()
     for path in sorted(KB_DIR.glob("*.md")):
-        raw = path.read_text(encoding="utf-8", errors="ignore")
-        meta, body = _parse_frontmatter(raw)
-        title = meta.get("title") or path.stem.replace("_", " ").title()
-        tags: List[str] = meta.get("tags") or []
-        syns: List[str] = meta.get("synonyms") or []
-
+        key = str(path)
+        st = path.stat()
+        sig = (st.st_mtime_ns, st.st_size)
+        cached = _PARSED.get(key)
+        if cached and cached[0] == sig:
+            parsed = cached[1]
+        else:
+            parsed = _parse_doc(path)
+            _PARSED[key] = (sig, parsed)
+            reparsed += 1
+        seen.add(key)
+
+        tags, syns = parsed["tags"], parsed["synonyms"]
         doc_id = next_doc_id; next_doc_id += 1
-        doc = {"id": doc_id, "path": str(path), "title": title, "tags": tags, "synonyms": syns, "text": body}
+        doc = {"id": doc_id, "path": key, "title": parsed["title"], "tags": tags, "synonyms": syns, "text": parsed["text"]}
         _DOCS.append(doc)
         _DOC_BY_ID[doc_id] = doc
 
@@ -134,30 +196,7 @@ def _build_index() -> None:
                 if tok:
                     _SYN_INDEX.setdefault(tok, set()).update(expanded)
 
-        # tokens de meta (para boosts)
-        title_tokens = _tokenize(title)
-        tag_tokens: List[str] = []
-        for t in tags:
-            tag_tokens.extend(_tokenize(t))
-        syn_tokens: List[str] = []
-        for s in syns:
-            syn_tokens.extend(_tokenize(s))
-
-        # chunking
-        for ch_text in _split_chunks(body):
-            tokens = _tokenize(ch_text)
-            tf: Dict[str, int] = {}
-            for t in tokens:
-                tf[t] = tf.get(t, 0) + 1
-
-            # boosts de meta
-            for t in title_tokens:
-                tf[t] = tf.get(t, 0) + TITLE_BOOST
-            for t in tag_tokens:
-                tf[t] = tf.get(t, 0) + TAGS_BOOST
-            for t in syn_tokens:
-                tf[t] = tf.get(t, 0) + SYN_BOOST
-
+        for ch_text, tf in parsed["chunks"]:
             _CHUNKS.append({
                 "id": next_chunk_id,
                 "doc_id": doc_id,
@@ -167,6 +206,10 @@ def _build_index() -> None:
             })
             next_chunk_id += 1
 
+    # arquivos removidos (ou KB_DIR trocado) saem do cache de parse
+    for key in [k for k in _PARSED if k not in seen]:
+        del _PARSED[key]
+
     # IDF/AVGDL
     N = len(_CHUNKS) or 1
     df: Dict[str, int] = {}
@@ -176,16 +219,22 @@ def _build_index() -> None:
     _IDF = {t: math.log((N - df_t + 0.5) / (df_t + 0.5) + 1.0) for t, df_t in df.items()}
     _AVGDL = sum(ch["len"] for ch in _CHUNKS) / (len(_CHUNKS) or 1)
 
+    KB_VERSION += 1
+    _SEARCH_CACHE.clear()  # chaves da versão anterior nunca mais casam
+
     try:
         KB_INDEX.write_text(json.dumps({
             "docs": len(_DOCS), "chunks": len(_CHUNKS), "avgdl": _AVGDL
         }, ensure_ascii=False, indent=2), encoding="utf-8")
     except Exception as e:
         logger.warning(f"[KB] não consegui gravar índice resumido: {e}")
+    return reparsed
 
 def reindex() -> Dict[str, Any]:
-    _build_index()
-    return {"docs": len(_DOCS), "chunks": len(_CHUNKS), "avgdl": _AVGDL}
+    global _INDEXED
+    reparsed = _build_index()
+    _INDEXED = True
+    return {"docs": len(_DOCS), "chunks": len(_CHUNKS), "avgdl": _AVGDL, "reparsed": reparsed}
 
 
 def rebuild_kb_index() -> Dict[str, Any]:
@@ -241,10 +290,16 @@ def search(
       score_final = bm25 * (1 + alpha * prior_doc)   | prior ~ [-1 .. +1]
     - Filtra por 'threshold' no score_final.
     - Saída: lista ordenada por 'score' decrescente com metadados.
+    - Memoizada por (KB_VERSION, parâmetros): vale até a próxima reindexação.
     """
+    ensure_index()
     if not _CHUNKS:
         return []
     priors = priors or {}
+    key = (KB_VERSION, query, k, threshold, alpha, tuple(sorted(priors.items())))
+    hit = _SEARCH_CACHE.get(key)
+    if hit is not None:
+        return [dict(h) for h in hit]
 
     scored: List[Tuple[float, Dict[str, Any], float, float]] = []
     for ch in _CHUNKS:
@@ -268,7 +323,10 @@ def search(
             "doc_path": doc["path"],
             "chunk_text": ch["text"],
         })
-    return out
+    if key[0] == KB_VERSION:  # não grava resultado de um índice que acabou de ser trocado
+        _SEARCH_CACHE.set(key, out)
+    # cópias dos hits: quem chama pode anotar/alterar sem corromper o cache
+    return [dict(h) for h in out]
 
 # --------------------------------------------------------------------------------------
 # Fallback simples para resposta direta (mantido para compatibilidade)
@@ -305,8 +363,17 @@ def kb_try_answer(query: str, threshold: float = 2.5, priors: Dict[str, float] |
 # Inicialização
 # --------------------------------------------------------------------------------------
 
-try:
-    stats = reindex()
-    logger.info(f"[KB] indexado: {stats}")
-except Exception as e:
-    logger.error(f"[KB] falha ao indexar: {e}")
+def ensure_index() -> None:
+    """Indexa a KB uma única vez (reindex() continua disponível para forçar)."""
+    global _INDEXED
+    if _INDEXED:
+        return
+    with _INDEX_LOCK:
+        if _INDEXED:
+            return
+        try:
+            stats = reindex()
+            logger.info(f"[KB] indexado: {stats}")
+        except Exception as e:
+            logger.error(f"[KB] falha ao indexar: {e}")
+            _INDEXED = True  # como no boot: não tenta de novo a cada busca; force_reindex refaz
@@ -142,7 +142,7 @@ def update_kb_article(slug: str, data: KBArticleUpdate) -> KBArticle:
 
 def force_reindex() -> Dict[str, Any]:
     """
-    Reconstrói o índice BM25 consumido pela triagem.
+    Reconstrói o índice BM25 consumido pela triagem (e invalida as buscas em cache via KB_VERSION).
     """
     return kb.reindex()
 
@@ -1,9 +1,13 @@
 # app/llm.py
 import os, json
+from functools import lru_cache
 from typing import List, Optional
+import httpx
 from pydantic import BaseModel, Field
 from openai import OpenAI
 
+from .config import HTTP2_AVAILABLE
+
 MODEL = os.getenv("LLM_MODEL", "gpt-4o-mini")
 MAX_TOKENS = int(os.getenv("LLM_MAX_TOKENS", "700"))
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
@@ -77,10 +81,16 @@ def _normalize_keys(data: dict) -> dict:
 
     return norm
 
+@lru_cache(maxsize=1)
+def _get_openai_client() -> OpenAI:
+    """Cliente único (pool httpx reaproveitado) em vez de um novo handshake TLS por ticket."""
+    http_client = httpx.Client(http2=HTTP2_AVAILABLE, limits=httpx.Limits(max_keepalive_connections=10))
+    return OpenAI(api_key=OPENAI_API_KEY, http_client=http_client)
+
 def classify_ticket_with_llm(subject: str, body: str) -> LLMClassification:
     if not OPENAI_API_KEY:
         raise RuntimeError("OPENAI_API_KEY ausente no .env")
-    client = OpenAI(api_key=OPENAI_API_KEY)
+    client = _get_openai_client()
     resp = client.chat.completions.create(
         model=MODEL,
         messages=_build_prompt(subject, body),
@@ -6,6 +6,7 @@ import sys
 import traceback
 import asyncio
 from datetime import datetime, timezone
+from typing import Any, Dict, List
 
 from dotenv import load_dotenv
 from fastapi import FastAPI, Request, HTTPException, Query
@@ -15,7 +16,7 @@ from loguru import logger
 from pydantic import BaseModel
 from tenacity import RetryError
 from app.teams_graph import diag_bot_token
-from app.ai.triage_agent import triage_next
+from app.ai.triage_agent import atriage_next
 from app.schemas import (
     KBArticle,
     KBArticleCreate,
@@ -94,6 +95,9 @@ from app.llm import classify_ticket_with_llm
 from app.teams_graph import (
     TeamsGraphError,
     notify_user_for_ticket,
+    notify_users_for_tickets,
+    anotify_user_for_ticket,
+    aclose_http as _aclose_teams_http,
     diag_token_info,
     diag_resolve_app,
     diag_user,
@@ -442,7 +446,7 @@ def debug_kb_reindex():
 
 
 @app.post("/debug/chat/triage", response_model=ChatResponse)
-def debug_chat_triage(body: ChatRequest):
+async def debug_chat_triage(body: ChatRequest):
     """
     Endpoint simples para testar o agente N1 via HTTP.
     Recebe hist��rico de mensagens + contexto (assunto/descri��ǜo)
@@ -470,7 +474,7 @@ def debug_chat_triage(body: ChatRequest):
         "description": description,
     }
 
-    out = triage_next(history, ticket)
+    out = await atriage_next(history, ticket)
 
     reply = out.get("message") or "Certo! Vou te guiar. Em qual tela/op��ǜo voc�� est�� agora?"
     checklist = out.get("checklist") or []
@@ -519,17 +523,37 @@ def _process_followups_once() -> int:
     """
     due = fetch_due_followups(limit=50)
     sent = 0
-    for fu in due:
-        ok = False
+
+    # monta o lote e envia tudo de uma vez (envios do bot em paralelo)
+    results: List[Any] = [None] * len(due)
+    batch: List[Dict[str, Any]] = []
+    positions: List[int] = []
+    for i, fu in enumerate(due):
         try:
             subject_line = fu.get("subject") or f"Ticket #{fu['ticket_id']}"
-            message = _format_followup_message(int(fu["ticket_id"]), subject_line, fu["message"])
-            graph_user_id = notify_user_for_ticket(
-                fu["requester_email"],
-                int(fu["ticket_id"]),
-                subject_line,
-                preview_text=message,
-            )
+            batch.append({
+                "user_email": fu["requester_email"],
+                "ticket_id": int(fu["ticket_id"]),
+                "subject": subject_line,
+                "preview_text": _format_followup_message(int(fu["ticket_id"]), subject_line, fu["message"]),
+            })
+            positions.append(i)
+        except Exception as e:
+            results[i] = e
+    if batch:
+        try:
+            outcomes = notify_users_for_tickets(batch)
+        except Exception as e:
+            outcomes = [e] * len(batch)
+        for i, outcome in zip(positions, outcomes):
+            results[i] = outcome
+
+    for fu, result in zip(due, results):
+        ok = False
+        try:
+            if isinstance(result, BaseException):
+                raise result
+            graph_user_id = result
             if graph_user_id:
                 set_user_current_ticket(fu["requester_email"], int(fu["ticket_id"]), teams_user_id=graph_user_id)
             ok = True
@@ -682,6 +706,9 @@ async def _boot_followups_loop():
     except Exception as e:
         logger.warning(f"[BOOT] init_db falhou (seguindo sem parar): {e}")
 
+    # indexa a KB antes do primeiro atendimento (fora do loop: lê e parseia os .md)
+    await asyncio.to_thread(kb.ensure_index)
+
     if os.getenv("ENABLE_INPROC_FOLLOWUPS", "0") == "1":
         async def _loop():
             interval = int(os.getenv("FOLLOWUP_POLL_SECONDS", "60"))
@@ -707,6 +734,14 @@ async def _boot_followups_loop():
 
         asyncio.create_task(_session_loop())
 
+
+@app.on_event("shutdown")
+async def _close_http_clients():
+    try:
+        await _aclose_teams_http()
+    except Exception as e:
+        logger.warning(f"[SHUTDOWN] falha ao fechar cliente HTTP do Teams: {e}")
+
 # -----------------------------------------------------------------------------#
 # BOT: carregamento seguro (sempre registra /api/messages)
 # -----------------------------------------------------------------------------#
@@ -1081,7 +1116,7 @@ async def ingest_movidesk(
         try:
             preview = f"Olá! Recebemos seu chamado #{ticket_id} sobre \"{subj or subject}\". Podemos iniciar o atendimento agora?"
             # notifica EXCLUSIVAMENTE o e-mail do solicitante
-            graph_user_id = notify_user_for_ticket(requester_email, ticket_id, subj or f"Ticket #{ticket_id}", preview_text=preview)
+            graph_user_id = await anotify_user_for_ticket(requester_email, ticket_id, subj or f"Ticket #{ticket_id}", preview_text=preview)
             notified = True
             if graph_user_id:
                 set_user_current_ticket(requester_email, ticket_id, teams_user_id=graph_user_id)
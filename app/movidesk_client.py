@@ -1,23 +1,80 @@
 # app/movidesk_client.py
+import atexit
 import os
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from functools import lru_cache
 from http import HTTPStatus
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterator, Optional
 
 import httpx
+import orjson
 from tenacity import retry, stop_after_attempt, wait_exponential
+from tenacity.wait import wait_base
 from dotenv import load_dotenv
 
+from .config import HTTP2_AVAILABLE
+from .ttl_cache import TTLCache
+
 load_dotenv()
 
 MOVIDESK_BASE = "https://api.movidesk.com/public/v1"
 
+# Cliente compartilhado: reaproveita as conexões TCP/TLS entre chamadas e, com
+# HTTP/2 disponível, multiplexa as requisições numa única conexão.
+_HTTP = httpx.Client(
+    http2=HTTP2_AVAILABLE,
+    timeout=30,
+    headers={"Accept": "application/json"},
+    limits=httpx.Limits(max_keepalive_connections=4, max_connections=4 if HTTP2_AVAILABLE else 16),
+)
+atexit.register(_HTTP.close)
+
+_JSON_HEADERS = {"Content-Type": "application/json"}
+# status aceitos como sucesso nas escritas (ações, notas, status)
+_WRITE_OK = frozenset({HTTPStatus.OK, HTTPStatus.CREATED, HTTPStatus.ACCEPTED, HTTPStatus.NO_CONTENT})
+
+_SELECT_SAFE = "id,subject,origin,originEmailAccount,createdDate,status,category,urgency"
+_BASE_RECENT_PARAMS = {
+    "$select": _SELECT_SAFE,
+    "$expand": "owner,clients",
+    "$filter": "lastUpdate ge 2000-01-01T00:00:00Z",
+}
+
 
 class MovideskError(Exception):
-    pass
+    def __init__(self, *args, retry_after: float = 0.0):
+        super().__init__(*args)
+        # segundos sugeridos pelo servidor (Retry-After) antes de tentar de novo
+        self.retry_after = retry_after
+
+
+class _wait_retry_after(wait_base):
+    """
+    Espera o Retry-After informado pelo Movidesk (429) quando houver;
+    nunca menos que o backoff exponencial padrão.
+    O teto (8s, o mesmo do backoff) vale também para o Retry-After: o tenacity dorme
+    com time.sleep e estas funções também rodam dentro de handlers async.
+    """
+
+    def __init__(self, fallback: wait_base, cap: float = 8.0):
+        self.fallback = fallback
+        self.cap = cap
+
+    def __call__(self, retry_state) -> float:
+        exc = retry_state.outcome.exception() if retry_state.outcome else None
+        retry_after = min(float(getattr(exc, "retry_after", 0.0) or 0.0), self.cap)
+        return max(retry_after, self.fallback(retry_state))
+
+
+_RETRY_WAIT = _wait_retry_after(wait_exponential(multiplier=1, min=1, max=8))
 
 
 # ---------------- Internos ----------------
+# Variáveis de ambiente são lidas uma vez por processo (load_dotenv no import);
+# alterações no .env exigem reiniciar o serviço.
 
+@lru_cache(maxsize=1)
 def _get_token() -> str:
     token = os.getenv("MOVIDESK_TOKEN", "").strip()
     if not token:
@@ -25,6 +82,21 @@ def _get_token() -> str:
     return token
 
 
+def _retry_after_seconds(resp: httpx.Response) -> float:
+    raw = (resp.headers.get("Retry-After") or "").strip()
+    if not raw:
+        return 0.0
+    try:
+        return max(0.0, float(raw))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(raw)
+        return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+    except Exception:
+        return 0.0
+
+
 def _raise_http_error(resp: httpx.Response, context: str):
     try:
         detail = resp.text[:1200]
@@ -32,7 +104,8 @@ def _raise_http_error(resp: httpx.Response, context: str):
         detail = "<sem corpo>"
     raise MovideskError(
         f"[{context}] HTTP {resp.status_code} ao chamar {resp.request.method} {resp.request.url}. "
-        f"Resposta: {detail}"
+        f"Resposta: {detail}",
+        retry_after=_retry_after_seconds(resp),
     )
 
 
@@ -53,17 +126,6 @@ def _norm(s: str) -> str:
     return (s or "").strip().lower()
 
 
-def _contains_any(haystack: str, needles: List[str]) -> bool:
-    h = _norm(haystack)
-    for n in needles:
-        nrm = _norm(n)
-        if not nrm:
-            continue
-        if h == nrm or (nrm in h):
-            return True
-    return False
-
-
 def _ok_response(r: httpx.Response) -> dict:
     try:
         return r.json()
@@ -71,6 +133,7 @@ def _ok_response(r: httpx.Response) -> dict:
         return {"status": r.status_code}
 
 
+@lru_cache(maxsize=1)
 def _agent_created_by() -> Optional[Dict[str, str]]:
     """
     Retorna o objeto 'createdBy' para assinar a ação com um agente específico.
@@ -85,65 +148,68 @@ def _agent_created_by() -> Optional[Dict[str, str]]:
     return None
 
 
+# ---------------- Receitas bem-sucedidas ----------------
+# Cada tenant aceita formatos diferentes de $select/$expand; guardamos o índice da
+# tentativa que funcionou por último para começar por ela na próxima chamada.
+_SUCCESS_RECIPE: Dict[str, int] = {}
+
+
+def _recipe_order(name: str, total: int) -> List[int]:
+    first = _SUCCESS_RECIPE.get(name)
+    order = list(range(total))
+    if first is not None and 0 <= first < total:
+        order.remove(first)
+        order.insert(0, first)
+    return order
+
+
+def _forget_recipe(name: str, idx: int) -> None:
+    if _SUCCESS_RECIPE.get(name) == idx:
+        _SUCCESS_RECIPE.pop(name, None)
+
+
 # ---------------- Ticket por ID ----------------
 
-@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=1, max=8))
+@retry(stop=stop_after_attempt(3), wait=_RETRY_WAIT)
 def get_ticket_by_id(ticket_id: int) -> dict:
     """
     Busca robusta por ID com várias tentativas ($select/$expand variam por tenant).
+    A última tentativa bem-sucedida é testada primeiro nas chamadas seguintes.
     """
     token = _get_token()
-    headers = {"Accept": "application/json"}
-    select_safe = "id,subject,origin,originEmailAccount,createdDate,status,category,urgency"
+    by_id = f"id eq {ticket_id}"
 
-    with httpx.Client(timeout=25, headers=headers) as client:
+    # (caminho, params extras, contexto, resposta em lista?)
+    attempts = (
         # 1) direta simples
-        r = client.get(f"{MOVIDESK_BASE}/tickets/{ticket_id}", params={"token": token})
-        if r.status_code == 200:
-            return r.json()
-        if r.status_code not in (404, 400):
-            _raise_http_error(r, "tickets/{id} (simples)")
-
+        (f"tickets/{ticket_id}", {}, "tickets/{id} (simples)", False),
         # 2) direta com select/expand
-        params = {"token": token, "$select": select_safe, "$expand": "owner,clients"}
-        r = client.get(f"{MOVIDESK_BASE}/tickets/{ticket_id}", params=params)
-        if r.status_code == 200:
-            return r.json()
-        if r.status_code not in (404, 400):
-            _raise_http_error(r, "tickets/{id} (select+expand)")
-
+        (f"tickets/{ticket_id}", {"$select": _SELECT_SAFE, "$expand": "owner,clients"}, "tickets/{id} (select+expand)", False),
         # 3) lista com filtro + expand
-        params = {
-            "token": token,
-            "$filter": f"id eq {ticket_id}",
-            "$select": select_safe,
-            "$expand": "owner,clients",
-            "$top": 1,
-        }
-        r = client.get(f"{MOVIDESK_BASE}/tickets", params=params)
-        if _ensure_ok(r, "tickets (filter+select+expand)"):
-            data = r.json()
-            t = _pick_first(data)
-            if t:
-                return t
-
+        ("tickets", {"$filter": by_id, "$select": _SELECT_SAFE, "$expand": "owner,clients", "$top": 1}, "tickets (filter+select+expand)", True),
         # 4) lista com filtro sem expand
-        params = {"token": token, "$filter": f"id eq {ticket_id}", "$select": select_safe, "$top": 1}
-        r = client.get(f"{MOVIDESK_BASE}/tickets", params=params)
-        if _ensure_ok(r, "tickets (filter+select)"):
-            data = r.json()
-            t = _pick_first(data)
-            if t:
-                return t
-
+        ("tickets", {"$filter": by_id, "$select": _SELECT_SAFE, "$top": 1}, "tickets (filter+select)", True),
         # 5) past
-        params = {"token": token, "$filter": f"id eq {ticket_id}", "$select": select_safe, "$top": 1}
-        r = client.get(f"{MOVIDESK_BASE}/tickets/past", params=params)
-        if _ensure_ok(r, "tickets/past (filter+select)"):
-            data = r.json()
-            t = _pick_first(data)
-            if t:
-                return t
+        ("tickets/past", {"$filter": by_id, "$select": _SELECT_SAFE, "$top": 1}, "tickets/past (filter+select)", True),
+    )
+
+    for idx in _recipe_order("get_ticket_by_id", len(attempts)):
+        path, extra, context, is_list = attempts[idx]
+        r = _HTTP.get(f"{MOVIDESK_BASE}/{path}", params={"token": token, **extra}, timeout=25)
+        t = None
+        if is_list:
+            if _ensure_ok(r, context):
+                t = _pick_first(r.json())
+        elif r.status_code == 200:
+            t = r.json()
+        elif r.status_code not in (404, 400):
+            _raise_http_error(r, context)
+        if t:
+            _SUCCESS_RECIPE["get_ticket_by_id"] = idx
+            return t
+        # lista vazia = ticket inexistente, não rota ruim: só esquecemos rota recusada
+        if r.status_code in (400, 404):
+            _forget_recipe("get_ticket_by_id", idx)
 
     raise MovideskError(f"Ticket {ticket_id} não encontrado em nenhuma rota suportada.")
 
@@ -151,44 +217,49 @@ def get_ticket_by_id(ticket_id: int) -> dict:
 # ---------------- Listagens para varrer recentes / “último da TI” ----------------
 
 def _list_tickets(path: str, params: dict, context: str) -> List[dict]:
-    token = _get_token()
-    headers = {"Accept": "application/json"}
-    p = dict(params)
-    p["token"] = token
-    with httpx.Client(timeout=25, headers=headers) as client:
-        r = client.get(f"{MOVIDESK_BASE}/{path}", params=p)
-        if not _ensure_ok(r, f"{path} ({context})"):
-            return []
-        data = r.json()
-        return data if isinstance(data, list) else []
+    """'params' já deve conter o token."""
+    r = _HTTP.get(f"{MOVIDESK_BASE}/{path}", params=params, timeout=25)
+    if not _ensure_ok(r, f"{path} ({context})"):
+        return []
+    data = r.json()
+    return data if isinstance(data, list) else []
 
 
 def _list_recent_batch(limit: int = 100, use_past: bool = False, with_orderby: bool = True, skip: int = 0) -> List[dict]:
     """
     Busca um lote de tickets recentes (qualquer canal). Quem chama filtra por origin==3 e por conta.
     """
-    select_safe = "id,subject,origin,originEmailAccount,createdDate,status,category,urgency"
-    filter_expr = "lastUpdate ge 2000-01-01T00:00:00Z"
     path = "tickets/past" if use_past else "tickets"
-
-    params = {
-        "$select": select_safe,
-        "$expand": "owner,clients",
-        "$top": limit,
-        "$skip": skip,
-        "$filter": filter_expr,
-    }
+    params = {**_BASE_RECENT_PARAMS, "$top": limit, "$skip": skip, "token": _get_token()}
     if with_orderby:
         params["$orderby"] = "id desc"
 
     return _list_tickets(path, params, f"_list_recent_batch {path} skip={skip}")
 
 
-def sample_email_channel(max_items: int = 300) -> List[dict]:
+# Páginas da varredura ficam em cache por alguns segundos: /debug/sample e
+# /debug/latest-ti chamados em sequência reaproveitam as mesmas respostas.
+# Só páginas com tickets: [] também é o retorno de um 4xx/5xx e não pode ficar 30s em cache.
+_SCAN_CACHE: TTLCache[List[dict]] = TTLCache(ttl=30.0, maxsize=256)
+
+
+def _recent_page(limit: int, use_past: bool, with_orderby: bool, skip: int) -> List[dict]:
+    key = (limit, use_past, with_orderby, skip)
+    batch = _SCAN_CACHE.get(key)
+    if batch is None:
+        batch = _list_recent_batch(limit=limit, use_past=use_past, with_orderby=with_orderby, skip=skip)
+        if batch:
+            _SCAN_CACHE.set(key, batch)
+    # cópias: quem chama pode alterar os tickets sem mexer na página em cache
+    return [dict(t) for t in batch]
+
+
+def _iter_origin3_tickets(max_items: int) -> Iterator[dict]:
     """
-    Retorna amostra de tickets com origin==3 para inspecionar originEmailAccount (debug).
+    Percorre tickets recentes (atuais e 'past', com e sem $orderby) até 'max_items'
+    verificados e entrega, sem repetir IDs, apenas os de origem e-mail (origin==3).
     """
-    results: List[dict] = []
+    seen: set = set()
     checked = 0
     page_size = 100
 
@@ -197,87 +268,57 @@ def sample_email_channel(max_items: int = 300) -> List[dict]:
             skip = 0
             while checked < max_items:
                 take = min(page_size, max_items - checked)
-                batch = _list_recent_batch(limit=take, use_past=use_past, with_orderby=with_orderby, skip=skip)
+                batch = _recent_page(take, use_past, with_orderby, skip)
                 if not batch:
                     break
                 for t in batch:
-                    try:
-                        if int(t.get("origin", 0)) == 3:
-                            results.append({
-                                "id": t.get("id"),
-                                "subject": t.get("subject"),
-                                "originEmailAccount": t.get("originEmailAccount") or "",
-                            })
-                    except Exception:
-                        pass
+                    # Movidesk devolve 'origin' como inteiro nativo
+                    if t.get("origin") != 3:
+                        continue
+                    tid = t.get("id")
+                    if tid in seen:
+                        continue
+                    seen.add(tid)
+                    yield t
                 checked += len(batch)
                 skip += take
 
-    # dedup preservando ordem
-    seen = set()
-    unique = []
-    for r in results:
-        k = r["id"]
-        if k in seen:
-            continue
-        seen.add(k)
-        unique.append(r)
-    return unique
+
+def sample_email_channel(max_items: int = 300) -> List[dict]:
+    """
+    Retorna amostra de tickets com origin==3 para inspecionar originEmailAccount (debug).
+    """
+    return [
+        {
+            "id": t.get("id"),
+            "subject": t.get("subject"),
+            "originEmailAccount": t.get("originEmailAccount") or "",
+        }
+        for t in _iter_origin3_tickets(max_items)
+    ]
 
 
-@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=1, max=8))
+@retry(stop=stop_after_attempt(3), wait=_RETRY_WAIT)
 def get_latest_ticket_for_email_account_multi(allowed_accounts: List[str], max_take: int = 50) -> List[dict]:
     """
     Retorna até 'max_take' tickets mais recentes (origin==3) cuja originEmailAccount
     combine com algum item de 'allowed_accounts'. Mantém ordem recente e remove duplicados.
     Compatível com /debug/latest-ti.
     """
-    allowed_accounts = [a for a in allowed_accounts if a and a.strip()]
-    if not allowed_accounts:
+    # normaliza uma vez só, fora do laço por ticket
+    allowed_norm = tuple(_norm(a) for a in allowed_accounts if a and a.strip())
+    if not allowed_norm:
         raise MovideskError("Lista de contas vazia para filtro")
 
     results: List[dict] = []
-    seen_ids: set[int] = set()
-
-    checked = 0
-    page_size = 100
     # aumenta o alcance total proporcional ao que o caller pediu
     max_items = max(500, max_take * 20)
 
-    for use_past in (False, True):
-        for with_orderby in (True, False):
-            skip = 0
-            while checked < max_items and len(results) < max_take:
-                take = min(page_size, max_items - checked)
-                batch = _list_recent_batch(limit=take, use_past=use_past, with_orderby=with_orderby, skip=skip)
-                if not batch:
-                    break
-
-                for t in batch:
-                    try:
-                        if int(t.get("origin", 0)) != 3:
-                            continue
-                    except Exception:
-                        continue
-
-                    acc = (t.get("originEmailAccount") or "")
-                    if not _contains_any(acc, allowed_accounts):
-                        continue
-
-                    tid = t.get("id")
-                    if tid in seen_ids:
-                        continue
-                    seen_ids.add(tid)
-                    results.append(t)
-
-                    if len(results) >= max_take:
-                        break
-
-                checked += len(batch)
-                skip += take
-
-            if len(results) >= max_take:
-                break
+    for t in _iter_origin3_tickets(max_items):
+        acc = _norm(t.get("originEmailAccount"))
+        if not any(n in acc for n in allowed_norm):
+            continue
+        results.append(t)
         if len(results) >= max_take:
             break
 
@@ -286,7 +327,7 @@ def get_latest_ticket_for_email_account_multi(allowed_accounts: List[str], max_t
 
 # ---------------- Texto do chamado (assunto + corpo) ----------------
 
-@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=1, max=8))
+@retry(stop=stop_after_attempt(3), wait=_RETRY_WAIT)
 def get_ticket_text_bundle(ticket_id: int) -> dict:
     """
     Retorna:
@@ -295,7 +336,6 @@ def get_ticket_text_bundle(ticket_id: int) -> dict:
       - first_action_html (se disponível)
     """
     token = _get_token()
-    headers = {"Accept": "application/json"}
 
     def _clean_html(html: str) -> str:
         if not html:
@@ -331,51 +371,46 @@ def get_ticket_text_bundle(ticket_id: int) -> dict:
                 return True
         return False
 
-    with httpx.Client(timeout=25, headers=headers) as client:
+    # (caminho, params extras, contexto, formato da resposta)
+    attempts = (
         # B) expand com orderby asc
-        params = {"token": token, "$select": "id,subject", "$expand": "actions($orderby=id asc;$top=5)"}
-        r = client.get(f"{MOVIDESK_BASE}/tickets/{ticket_id}", params=params)
-        if _ensure_ok(r, "tickets/{id} expand actions+orderby"):
-            if r.status_code == 200:
-                data = r.json()
-                subject = subject or (data.get("subject") or "")
-                if _take_from_actions(data.get("actions") or []):
-                    return {"subject": subject, "first_action_text": first_text, "first_action_html": first_html}
-
+        (f"tickets/{ticket_id}", {"$select": "id,subject", "$expand": "actions($orderby=id asc;$top=5)"},
+         "tickets/{id} expand actions+orderby", "ticket"),
         # C) expand sem orderby
-        params = {"token": token, "$select": "id,subject", "$expand": "actions($top=5)"}
-        r = client.get(f"{MOVIDESK_BASE}/tickets/{ticket_id}", params=params)
-        if _ensure_ok(r, "tickets/{id} expand actions"):
-            if r.status_code == 200:
-                data = r.json()
-                subject = subject or (data.get("subject") or "")
-                if _take_from_actions(data.get("actions") or []):
-                    return {"subject": subject, "first_action_text": first_text, "first_action_html": first_html}
-
+        (f"tickets/{ticket_id}", {"$select": "id,subject", "$expand": "actions($top=5)"},
+         "tickets/{id} expand actions", "ticket"),
         # D) actions com orderby asc
-        params = {"token": token, "$top": 5, "$orderby": "id asc"}
-        r = client.get(f"{MOVIDESK_BASE}/tickets/{ticket_id}/actions", params=params)
-        if _ensure_ok(r, "tickets/{id}/actions orderby asc"):
-            if r.status_code == 200 and isinstance(r.json(), list):
-                if _take_from_actions(r.json()):
-                    return {"subject": subject, "first_action_text": first_text, "first_action_html": first_html}
-
+        (f"tickets/{ticket_id}/actions", {"$top": 5, "$orderby": "id asc"}, "tickets/{id}/actions orderby asc", "actions"),
         # E) actions sem orderby
-        params = {"token": token, "$top": 5}
-        r = client.get(f"{MOVIDESK_BASE}/tickets/{ticket_id}/actions", params=params)
-        if _ensure_ok(r, "tickets/{id}/actions"):
-            if r.status_code == 200 and isinstance(r.json(), list):
-                if _take_from_actions(r.json()):
-                    return {"subject": subject, "first_action_text": first_text, "first_action_html": first_html}
-
+        (f"tickets/{ticket_id}/actions", {"$top": 5}, "tickets/{id}/actions", "actions"),
         # F) html do ticket
-        params = {"token": token}
-        r = client.get(f"{MOVIDESK_BASE}/tickets/{ticket_id}/htmldescription", params=params)
-        if _ensure_ok(r, "tickets/{id}/htmldescription"):
-            if r.status_code == 200:
-                html = r.text or ""
-                first_html = html
-                first_text = _clean_html(html)
+        (f"tickets/{ticket_id}/htmldescription", {}, "tickets/{id}/htmldescription", "html"),
+    )
+
+    for idx in _recipe_order("get_ticket_text_bundle", len(attempts)):
+        path, extra, context, kind = attempts[idx]
+        r = _HTTP.get(f"{MOVIDESK_BASE}/{path}", params={"token": token, **extra}, timeout=25)
+        found = False
+        if _ensure_ok(r, context) and r.status_code == 200:
+            if kind == "ticket":
+                data = r.json()
+                subject = subject or (data.get("subject") or "")
+                found = _take_from_actions(data.get("actions") or [])
+            elif kind == "actions":
+                data = r.json()
+                found = isinstance(data, list) and _take_from_actions(data)
+            else:
+                first_html = r.text or ""
+                first_text = _clean_html(first_html)
+                found = bool(first_html)
+        if found:
+            # html é só o último recurso (sempre responde): não vira rota preferida
+            if kind != "html":
+                _SUCCESS_RECIPE["get_ticket_text_bundle"] = idx
+            break
+        # conteúdo vazio depende do ticket, não do tenant: só esquecemos rota recusada
+        if r.status_code in (400, 404):
+            _forget_recipe("get_ticket_text_bundle", idx)
 
     return {
         "subject": subject,
@@ -386,7 +421,7 @@ def get_ticket_text_bundle(ticket_id: int) -> dict:
 
 # ---------------- Ações/Notas públicas + fechamento ----------------
 
-@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=1, max=8))
+@retry(stop=stop_after_attempt(3), wait=_RETRY_WAIT)
 def add_public_note(ticket_id: int, note_text: str) -> dict:
     """
     Cria uma **AÇÃO pública** na timeline do ticket, assinando (se possível) com o agente
@@ -400,7 +435,6 @@ def add_public_note(ticket_id: int, note_text: str) -> dict:
       5) POST /tickets override (notes[id=0])            ← último recurso (nota)
     """
     token = _get_token()
-    headers_json = {"Accept": "application/json", "Content-Type": "application/json"}
     params = {"token": token, "id": str(int(ticket_id))}
 
     text = (note_text or "").strip()
@@ -432,31 +466,7 @@ def add_public_note(ticket_id: int, note_text: str) -> dict:
         note_obj["createdBy"] = created_by
     body_notes = {"id": int(ticket_id), "notes": [note_obj]}
 
-    attempts_log: List[Dict[str, Any]] = []
-
-    # 1) PATCH /tickets (actions)
-    with httpx.Client(timeout=30, headers=headers_json) as c1:
-        r1 = c1.patch(f"{MOVIDESK_BASE}/tickets", params=params, json=body_actions)
-        if r1.status_code in (HTTPStatus.OK, HTTPStatus.CREATED, HTTPStatus.ACCEPTED, HTTPStatus.NO_CONTENT):
-            return {
-                "ok": True, "status": r1.status_code, "attempt": "PATCH /tickets (actions)",
-                "response": _ok_response(r1), "attempts": attempts_log
-            }
-        attempts_log.append({"label": "PATCH /tickets (actions)", "status": r1.status_code, "body": r1.text[:600]})
-
-    # 2) POST override PATCH /tickets (actions)
-    headers_override = dict(headers_json)
-    headers_override["X-HTTP-Method-Override"] = "PATCH"
-    with httpx.Client(timeout=30, headers=headers_override) as c2:
-        r2 = c2.post(f"{MOVIDESK_BASE}/tickets", params=params, json=body_actions)
-        if r2.status_code in (HTTPStatus.OK, HTTPStatus.CREATED, HTTPStatus.ACCEPTED, HTTPStatus.NO_CONTENT):
-            return {
-                "ok": True, "status": r2.status_code, "attempt": "POST override PATCH /tickets (actions)",
-                "response": _ok_response(r2), "attempts": attempts_log
-            }
-        attempts_log.append({"label": "POST override PATCH /tickets (actions)", "status": r2.status_code, "body": r2.text[:600]})
-
-    # 3) POST /tickets/{id}/actions  (alguns tenants permitem)
+    # Payload para POST /tickets/{id}/actions (alguns tenants permitem)
     body_post_action = {
         "description": text,
         "isHtmlDescription": False,
@@ -467,71 +477,67 @@ def add_public_note(ticket_id: int, note_text: str) -> dict:
     if created_by:
         body_post_action["createdBy"] = created_by
 
-    with httpx.Client(timeout=30, headers=headers_json) as c3:
-        r3 = c3.post(f"{MOVIDESK_BASE}/tickets/{ticket_id}/actions", params={"token": token}, json=body_post_action)
-        if r3.status_code in (HTTPStatus.OK, HTTPStatus.CREATED, HTTPStatus.ACCEPTED, HTTPStatus.NO_CONTENT):
-            return {
-                "ok": True, "status": r3.status_code, "attempt": "POST /tickets/{id}/actions",
-                "response": _ok_response(r3), "attempts": attempts_log
-            }
-        attempts_log.append({"label": "POST /tickets/{id}/actions", "status": r3.status_code, "body": r3.text[:600]})
-
-    # 4) PATCH /tickets (notes) — último recurso (aparece em "Notas")
-    with httpx.Client(timeout=30, headers=headers_json) as c4:
-        r4 = c4.patch(f"{MOVIDESK_BASE}/tickets", params=params, json=body_notes)
-        if r4.status_code in (HTTPStatus.OK, HTTPStatus.CREATED, HTTPStatus.ACCEPTED, HTTPStatus.NO_CONTENT):
-            return {
-                "ok": True, "status": r4.status_code, "attempt": "PATCH /tickets (notes)",
-                "kind": "note", "response": _ok_response(r4), "attempts": attempts_log
-            }
-        attempts_log.append({"label": "PATCH /tickets (notes)", "status": r4.status_code, "body": r4.text[:600]})
-
-    # 5) POST override PATCH /tickets (notes)
-    with httpx.Client(timeout=30, headers=headers_override) as c5:
-        r5 = c5.post(f"{MOVIDESK_BASE}/tickets", params=params, json=body_notes)
-        if r5.status_code in (HTTPStatus.OK, HTTPStatus.CREATED, HTTPStatus.ACCEPTED, HTTPStatus.NO_CONTENT):
-            return {
-                "ok": True, "status": r5.status_code, "attempt": "POST override PATCH /tickets (notes)",
-                "kind": "note", "response": _ok_response(r5), "attempts": attempts_log
-            }
-        attempts_log.append({"label": "POST override PATCH /tickets (notes)", "status": r5.status_code, "body": r5.text[:600]})
+    # serializa uma única vez; o mesmo corpo é reaproveitado entre as tentativas
+    payload_actions = orjson.dumps(body_actions)
+    payload_notes = orjson.dumps(body_notes)
+    payload_post_action = orjson.dumps(body_post_action)
+
+    override = {**_JSON_HEADERS, "X-HTTP-Method-Override": "PATCH"}
+    # (método, caminho, params, headers, corpo, rótulo, tipo)
+    attempts = (
+        ("PATCH", "/tickets", params, _JSON_HEADERS, payload_actions, "PATCH /tickets (actions)", None),
+        ("POST", "/tickets", params, override, payload_actions, "POST override PATCH /tickets (actions)", None),
+        ("POST", f"/tickets/{ticket_id}/actions", {"token": token}, _JSON_HEADERS, payload_post_action, "POST /tickets/{id}/actions", None),
+        ("PATCH", "/tickets", params, _JSON_HEADERS, payload_notes, "PATCH /tickets (notes)", "note"),
+        ("POST", "/tickets", params, override, payload_notes, "POST override PATCH /tickets (notes)", "note"),
+    )
 
+    attempts_log: List[Dict[str, Any]] = []
+    last_detail = ""
+
+    for method, path, attempt_params, headers, body, label, kind in attempts:
+        r = _HTTP.request(method, f"{MOVIDESK_BASE}{path}", params=attempt_params, content=body, headers=headers, timeout=30)
+        if r.status_code in _WRITE_OK:
+            result: Dict[str, Any] = {"ok": True, "status": r.status_code, "attempt": label}
+            if kind:
+                result["kind"] = kind
+            result["response"] = _ok_response(r)
+            result["attempts"] = attempts_log
+            return result
+        attempts_log.append({"label": label, "status": r.status_code, "body": r.text[:600]})
         try:
-            last_detail = r5.text[:1200]
+            last_detail = r.text[:1200]
         except Exception:
-            last_detail = f"HTTP {r5.status_code} (sem corpo)"
+            last_detail = f"HTTP {r.status_code} (sem corpo)"
 
     raise MovideskError(
         f"[tickets] Falha ao anexar AÇÃO/nota no ticket {ticket_id}. Última resposta: {last_detail}"
     )
 
 
-@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=1, max=8))
+@retry(stop=stop_after_attempt(3), wait=_RETRY_WAIT)
 def close_ticket(ticket_id: int, status_name: str = "Resolvido", justification: Optional[str] = None) -> dict:
     """
     Ajusta o status via PATCH /tickets (&id na query) ou override por POST,
     com 'justification' opcional (se sua base exigir motivo).
     """
     token = _get_token()
-    headers = {"Accept": "application/json", "Content-Type": "application/json"}
     params = {"token": token, "id": str(int(ticket_id))}
     body: Dict[str, Any] = {"status": status_name}
     if justification:
         body["justification"] = justification
+    payload = orjson.dumps(body)
 
     # PATCH direto
-    with httpx.Client(timeout=20, headers=headers) as c1:
-        r1 = c1.patch(f"{MOVIDESK_BASE}/tickets", params=params, json=body)
-        if r1.status_code in (HTTPStatus.OK, HTTPStatus.ACCEPTED, HTTPStatus.NO_CONTENT, HTTPStatus.CREATED):
-            return {"ok": True, "status": r1.status_code, "attempt": "PATCH /tickets (status)", "response": _ok_response(r1)}
+    r1 = _HTTP.patch(f"{MOVIDESK_BASE}/tickets", params=params, content=payload, headers=_JSON_HEADERS, timeout=20)
+    if r1.status_code in _WRITE_OK:
+        return {"ok": True, "status": r1.status_code, "attempt": "PATCH /tickets (status)", "response": _ok_response(r1)}
 
     # Override
-    headers2 = dict(headers)
-    headers2["X-HTTP-Method-Override"] = "PATCH"
-    with httpx.Client(timeout=20, headers=headers2) as c2:
-        r2 = c2.post(f"{MOVIDESK_BASE}/tickets", params=params, json=body)
-        if r2.status_code in (HTTPStatus.OK, HTTPStatus.ACCEPTED, HTTPStatus.NO_CONTENT, HTTPStatus.CREATED):
-            return {"ok": True, "status": r2.status_code, "attempt": "POST override PATCH /tickets (status)", "response": _ok_response(r2)}
+    headers2 = {**_JSON_HEADERS, "X-HTTP-Method-Override": "PATCH"}
+    r2 = _HTTP.post(f"{MOVIDESK_BASE}/tickets", params=params, content=payload, headers=headers2, timeout=20)
+    if r2.status_code in _WRITE_OK:
+        return {"ok": True, "status": r2.status_code, "attempt": "POST override PATCH /tickets (status)", "response": _ok_response(r2)}
 
     _raise_http_error(r1, "tickets (close_ticket)")
 
@@ -544,40 +550,39 @@ def list_actions(ticket_id: int, top: int = 10) -> List[dict]:
     se falhar, cai para /tickets/{id}/actions.
     """
     token = _get_token()
-    headers = {"Accept": "application/json"}
-    with httpx.Client(timeout=20, headers=headers) as client:
-        # expand=actions
-        r = client.get(
-            f"{MOVIDESK_BASE}/tickets/{ticket_id}",
-            params={"token": token, "$select": "id", "$expand": f"actions($orderby=id desc;$top={top})"},
-        )
-        if _ensure_ok(r, "tickets/{id} expand actions"):
-            data = r.json() or {}
-            acts = data.get("actions") or []
-            if isinstance(acts, list):
-                return acts
-
-        # fallback endpoint direto
-        r2 = client.get(
-            f"{MOVIDESK_BASE}/tickets/{ticket_id}/actions",
-            params={"token": token, "$orderby": "id desc", "$top": top},
-        )
-        if not _ensure_ok(r2, "tickets/{id}/actions"):
-            return []
-        data2 = r2.json()
-        return data2 if isinstance(data2, list) else []
+    # expand=actions
+    r = _HTTP.get(
+        f"{MOVIDESK_BASE}/tickets/{ticket_id}",
+        params={"token": token, "$select": "id", "$expand": f"actions($orderby=id desc;$top={top})"},
+        timeout=20,
+    )
+    if _ensure_ok(r, "tickets/{id} expand actions"):
+        data = r.json() or {}
+        acts = data.get("actions") or []
+        if isinstance(acts, list):
+            return acts
+
+    # fallback endpoint direto
+    r2 = _HTTP.get(
+        f"{MOVIDESK_BASE}/tickets/{ticket_id}/actions",
+        params={"token": token, "$orderby": "id desc", "$top": top},
+        timeout=20,
+    )
+    if not _ensure_ok(r2, "tickets/{id}/actions"):
+        return []
+    data2 = r2.json()
+    return data2 if isinstance(data2, list) else []
 
 
 def list_notes(ticket_id: int, top: int = 10) -> List[dict]:
     token = _get_token()
-    headers = {"Accept": "application/json"}
-    with httpx.Client(timeout=20, headers=headers) as client:
-        # expand=notes(...): retorna junto ao ticket
-        r = client.get(
-            f"{MOVIDESK_BASE}/tickets/{ticket_id}",
-            params={"token": token, "$select": "id", "$expand": f"notes($orderby=id desc;$top={top})"},
-        )
-        if not _ensure_ok(r, "tickets/{id} expand notes"):
-            return []
-        data = r.json() or {}
-        return data.get("notes") or []
+    # expand=notes(...): retorna junto ao ticket
+    r = _HTTP.get(
+        f"{MOVIDESK_BASE}/tickets/{ticket_id}",
+        params={"token": token, "$select": "id", "$expand": f"notes($orderby=id desc;$top={top})"},
+        timeout=20,
+    )
+    if not _ensure_ok(r, "tickets/{id} expand notes"):
+        return []
+    data = r.json() or {}
+    return data.get("notes") or []
@@ -1,41 +1,57 @@
 from __future__ import annotations
 
 import re
-from typing import List
+from typing import Annotated, Any, List
 
-from pydantic import BaseModel, Field, field_validator
+from pydantic import AfterValidator, BaseModel, BeforeValidator, Field, StringConstraints
+from pydantic_core import PydanticCustomError
 
 _SLUG_RE = re.compile(r"^[a-z0-9][a-z0-9_-]{1,64}$")
 
 
+def _check_slug(value: str) -> str:
+    if not _SLUG_RE.match(value):
+        raise PydanticCustomError(
+            "slug_invalido", "slug deve conter apenas letras minúsculas, números, '-' ou '_'"
+        )
+    return value
+
+
+# strip/lower rodam dentro do pydantic-core; o formato é conferido depois, já em minúsculas,
+# com mensagem em PT-BR.
+Slug = Annotated[
+    str,
+    StringConstraints(strip_whitespace=True, to_lower=True),
+    AfterValidator(_check_slug),
+]
+
+
+def _ensure_tags(value: Any) -> List[str]:
+    if value is None:
+        return []
+    if isinstance(value, str):
+        value = [value]
+    return [str(tag).strip() for tag in list(value) if str(tag).strip()]
+
+
+Tags = Annotated[List[str], BeforeValidator(_ensure_tags)]
+
+
 class KBArticleBase(BaseModel):
     """
     Representa metadados básicos de um artigo de KB.
     O campo 'slug' é usado como nome do arquivo em app/knowledge/{slug}.md.
     """
 
-    slug: str = Field(..., description="Identificador único (usado para o nome do arquivo .md).")
+    slug: Slug = Field(
+        ...,
+        description="Identificador único (usado para o nome do arquivo .md). "
+        "Apenas letras minúsculas, números, '-' ou '_'.",
+    )
     titulo: str = Field(..., description="Título exibido do artigo.")
-    tags: List[str] = Field(default_factory=list, description="Lista de tags/keywords.")
+    tags: Tags = Field(default_factory=list, description="Lista de tags/keywords.")
     ativo: bool = Field(default=True, description="Indica se o artigo está ativo na KB.")
 
-    @field_validator("slug")
-    @classmethod
-    def _validate_slug(cls, value: str) -> str:
-        slug = (value or "").strip().lower()
-        if not _SLUG_RE.match(slug):
-            raise ValueError("slug deve conter apenas letras minúsculas, números, '-' ou '_'")
-        return slug
-
-    @field_validator("tags", mode="before")
-    @classmethod
-    def _ensure_tags(cls, value):
-        if value is None:
-            return []
-        if isinstance(value, str):
-            value = [value]
-        return [str(tag).strip() for tag in list(value) if str(tag).strip()]
-
 
 class KBArticleCreate(KBArticleBase):
     conteudo_markdown: str = Field(..., description="Conteúdo principal em Markdown.")
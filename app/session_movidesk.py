@@ -3,6 +3,7 @@ from __future__ import annotations
 import os
 from typing import Dict, Any, Optional
 
+import orjson
 from loguru import logger
 
 from .movidesk_client import httpx, MOVIDESK_BASE, _get_token, add_public_note, MovideskError
@@ -54,7 +55,7 @@ def create_resolved_movidesk_ticket_from_session(session: Dict[str, Any], summar
 
     try:
         with httpx.Client(timeout=30, headers=headers) as client:
-            resp = client.post(f"{MOVIDESK_BASE}/tickets", params=params, json=payload)
+            resp = client.post(f"{MOVIDESK_BASE}/tickets", params=params, content=orjson.dumps(payload))
             if resp.status_code not in (200, 201):
                 logger.warning("[sessions] falha ao criar ticket Movidesk: %s %s", resp.status_code, resp.text[:400])
                 return None
@@ -1,9 +1,13 @@
 # app/summarizer.py
 from __future__ import annotations
 
+import hashlib
+import itertools
 import os
 import re
-from typing import List, Optional
+from typing import Dict, Iterator, List, Optional
+
+from .ttl_cache import TTLCache
 
 # OpenAI é opcional: só usamos se OPENAI_API_KEY estiver definido
 _OPENAI_KEY = os.getenv("OPENAI_API_KEY", "").strip()
@@ -15,18 +19,52 @@ if _OPENAI_KEY:
     except Exception:
         _CLIENT = None
 
+# _clean_text em duas passadas: markup (script/style, <br>, demais tags) e espaços.
+_RE_MARKUP = re.compile(r"<(script|style).*?>.*?</\1>|(<br\s*/?>)|<[^>]+>", re.I | re.S)
+_RE_SPACES = re.compile(r"\s*\n\s*|[ \t]+")
+_RE_BULLET = re.compile(r"^[-*•]\s+(.*)$")
+_RE_SENT = re.compile(r"(?<=[.!?])\s+")
+_RE_STEP = re.compile(r"^(\d+[\).\s]|[-*•])")
+_RE_NUM_PREFIX = re.compile(r"^\d+[\).\s]+")
+_RE_BULLET_PREFIX = re.compile(r"^[-*•]\s*")
+
+# Prompt de sistema fixo (byte a byte idêntico entre chamadas) para aproveitar o
+# cache automático de prefixo da OpenAI; o que varia (limite de palavras) vai no user.
+_PROMPT_SYSTEM = (
+    "Você é um assistente de suporte N1. Gere um resumo curto, objetivo e em português do Brasil "
+    "para registrar no histórico do chamado. "
+    "Formato sugerido:\n"
+    "Assunto (em 1 linha)\n"
+    "O que foi verificado / tentado (bullets)\n"
+    "Orientações / próximos passos (bullets)\n"
+    "Se houver links ou caminhos de menu, inclua-os de forma clara. "
+    "Respeite o limite de palavras indicado na mensagem do usuário."
+)
+
+# Cache de resumos gerados pelo LLM: sha256(transcrição limpa + limite) -> texto, por 24h.
+_SUM_CACHE: TTLCache[str] = TTLCache(ttl=86400.0, maxsize=4096)
+
+# Orçamento de entrada do LLM em caracteres (~4 chars/token); acima disso mantém início e fim.
+_SUM_MAX_INPUT_CHARS = int(os.getenv("OPENAI_SUMMARY_MAX_CHARS", "12000"))
+
+# Orçamento de saída: PT-BR fica em ~1,8–2,2 tokens por palavra; a folga cobre títulos e bullets,
+# para um resumo perto de max_words não ser cortado no meio da frase.
+_SUM_TOKENS_PER_WORD = 2.2
+_SUM_TOKENS_HEADROOM = 40
+
+
+def _summary_max_tokens(max_words: int) -> int:
+    return int(max_words * _SUM_TOKENS_PER_WORD) + _SUM_TOKENS_HEADROOM
+
 
 # ---------------- Utils internos ----------------
 
 def _clean_text(t: str) -> str:
     if not t:
         return ""
-    # remove HTML básico e normaliza espaços
-    t = re.sub(r"(?is)<(script|style).*?>.*?</\1>", " ", t)
-    t = re.sub(r"(?i)<br\s*/?>", "\n", t)
-    t = re.sub(r"<[^>]+>", " ", t)
-    t = re.sub(r"[ \t]+", " ", t)
-    t = re.sub(r"\s*\n\s*", "\n", t)
+    # remove HTML básico (<br> vira quebra de linha) e normaliza espaços
+    t = _RE_MARKUP.sub(lambda m: "\n" if m.group(2) else " ", t)
+    t = _RE_SPACES.sub(lambda m: "\n" if "\n" in m.group() else " ", t)
     return t.strip()
 
 
@@ -43,23 +81,30 @@ def _heuristic_summary(text: str, max_chars: int = 900) -> str:
     # coleta bullets explícitos
     bullets = []
     for line in text.splitlines():
-        ln = line.strip()
-        if re.match(r"^[-*•]\s+", ln):
-            bullets.append(ln)
+        m = _RE_BULLET.match(line.strip())
+        if m:
+            bullets.append(m.group(1))
+            if len(bullets) >= 6:
+                break
 
-    # coleta frases principais (primeiras 5–7)
-    sentences = re.split(r"(?<=[.!?])\s+", text)
-    core = " ".join(sentences[:6]).strip()
+    # coleta frases principais (primeiras 6) sem quebrar o texto inteiro
+    sentences = []
+    start = 0
+    for m in _RE_SENT.finditer(text):
+        sentences.append(text[start:m.start()])
+        start = m.end()
+        if len(sentences) >= 6:
+            break
+    else:
+        sentences.append(text[start:])
+    core = " ".join(sentences).strip()
 
     # monta
     parts = []
     if core:
         parts.append(core)
     if bullets:
-        cleaned = []
-        for bullet in bullets[:6]:
-            cleaned.append(re.sub(r"^[-*•]\s+", "", bullet))
-        bullets_block = "\n".join(f"- {item}" for item in cleaned)
+        bullets_block = "\n".join(f"- {item}" for item in bullets)
         parts.append("\nPrincipais pontos:\n" + bullets_block)
 
     out = ("\n\n".join(parts)).strip()
@@ -68,56 +113,136 @@ def _heuristic_summary(text: str, max_chars: int = 900) -> str:
     return out or "Resumo: (conteúdo insuficiente)."
 
 
+def _summary_key(transcript: str, max_words: int) -> str:
+    return hashlib.sha256(f"{_clean_text(transcript)}\x00{max_words}".encode("utf-8")).hexdigest()
+
+
+def _cached_summary(key: str) -> Optional[str]:
+    return _SUM_CACHE.get(key)
+
+
+def _store_summary(key: str, text: str) -> None:
+    _SUM_CACHE.set(key, text)
+
+
+def _compact_transcript(transcript: str, max_chars: int = _SUM_MAX_INPUT_CHARS) -> str:
+    """
+    Reduz a transcrição antes de ir ao LLM: limpa HTML/espaços, colapsa linhas
+    consecutivas repetidas e, se ainda passar do orçamento, corta o meio.
+    """
+    text = _clean_text(transcript)
+    text = "\n".join(line for line, _ in itertools.groupby(text.split("\n")))
+    if max_chars > 0 and len(text) > max_chars:
+        half = max_chars // 2
+        text = text[:half].rstrip() + "\n[...]\n" + text[-half:].lstrip()
+    return text
+
+
+def _summary_messages(transcript: str, max_words: int) -> List[Dict[str, str]]:
+    return [
+        {"role": "system", "content": _PROMPT_SYSTEM},
+        {
+            "role": "user",
+            "content": (
+                f"Limite: {max_words} palavras.\n\n"
+                "Transcrição/conteúdo a resumir (PT-BR):\n"
+                "---------------------------------------\n"
+                f"{transcript}\n"
+                "---------------------------------------"
+            ),
+        },
+    ]
+
+
 # ---------------- API pública ----------------
 
+def _llm_summary_deltas(transcript: str, max_words: int) -> Iterator[str]:
+    """Pedaços do resumo conforme o LLM gera; exceções sobem para quem chamou."""
+    stream = _CLIENT.chat.completions.create(
+        model=os.getenv("OPENAI_SUMMARY_MODEL", "gpt-4o-mini"),
+        messages=_summary_messages(_compact_transcript(transcript), max_words),
+        temperature=0.2,
+        max_tokens=_summary_max_tokens(max_words),
+        stop=["\n\n\n"],
+        presence_penalty=0,
+        stream=True,
+    )
+    for chunk in stream:
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta.content or ""
+        if delta:
+            yield delta
+
+
+def summarize_conversation_stream(transcript: str, max_words: int = 180) -> Iterator[str]:
+    """
+    Versão em streaming de summarize_conversation: devolve os pedaços do resumo
+    conforme o LLM gera (primeiro token em centenas de ms).
+    - Resumo em cache ou heurístico sai num único pedaço.
+    - Se o LLM falhar antes do primeiro pedaço, cai no heurístico; se falhar no meio,
+      encerra com o que já foi enviado (e não grava no cache).
+    """
+    transcript = (transcript or "").strip()
+    if not transcript:
+        yield "Resumo: (sem conversação registrada)."
+        return
+
+    # Sem chave → heurístico
+    if not _CLIENT:
+        yield _heuristic_summary(transcript)
+        return
+
+    key = _summary_key(transcript, max_words)
+    cached = _cached_summary(key)
+    if cached:
+        yield cached
+        return
+
+    parts: List[str] = []
+    try:
+        for delta in _llm_summary_deltas(transcript, max_words):
+            parts.append(delta)
+            yield delta
+    except Exception:
+        if parts:
+            return
+
+    text = "".join(parts).strip()
+    if text:
+        _store_summary(key, text)
+    else:
+        yield _heuristic_summary(transcript)
+
+
 def summarize_conversation(transcript: str, max_words: int = 180) -> str:
     """
     Gera um resumo curto e objetivo da conversa para registrar no ticket.
     - Se OPENAI_API_KEY existir, usa LLM (chat.completions).
     - Senão, aplica resumo heurístico local.
+    - Falha do LLM (mesmo no meio da resposta) cai no heurístico: nunca grava resumo cortado.
     """
     transcript = (transcript or "").strip()
     if not transcript:
         return "Resumo: (sem conversação registrada)."
 
-    # Caminho LLM (opcional)
-    if _CLIENT:
-        try:
-            prompt_system = (
-                "Você é um assistente de suporte N1. Gere um resumo curto, objetivo e em português do Brasil "
-                "para registrar no histórico do chamado. "
-                "Formato sugerido:\n"
-                "Assunto (em 1 linha)\n"
-                "O que foi verificado / tentado (bullets)\n"
-                "Orientações / próximos passos (bullets)\n"
-                "Se houver links ou caminhos de menu, inclua-os de forma clara. "
-                f"Limite a {max_words} palavras."
-            )
-            messages = [
-                {"role": "system", "content": prompt_system},
-                {
-                    "role": "user",
-                    "content": (
-                        "Transcrição/conteúdo a resumir (PT-BR):\n"
-                        "---------------------------------------\n"
-                        f"{transcript}\n"
-                        "---------------------------------------"
-                    ),
-                },
-            ]
-            resp = _CLIENT.chat.completions.create(
-                model=os.getenv("OPENAI_SUMMARY_MODEL", "gpt-4o-mini"),
-                messages=messages,
-                temperature=0.2,
-                max_tokens=500,
-            )
-            text = (resp.choices[0].message.content or "").strip()
-            return text or _heuristic_summary(transcript)
-        except Exception:
-            return _heuristic_summary(transcript)
-
     # Sem chave → heurístico
-    return _heuristic_summary(transcript)
+    if not _CLIENT:
+        return _heuristic_summary(transcript)
+
+    key = _summary_key(transcript, max_words)
+    cached = _cached_summary(key)
+    if cached:
+        return cached
+
+    try:
+        text = "".join(_llm_summary_deltas(transcript, max_words)).strip()
+    except Exception:
+        text = ""
+    if not text:
+        return _heuristic_summary(transcript)
+    _store_summary(key, text)
+    return text
 
 
 def extract_steps(text: str, max_steps: int = 7) -> List[str]:
@@ -128,12 +253,12 @@ def extract_steps(text: str, max_steps: int = 7) -> List[str]:
     if not text:
         return []
     lines = [l.strip(" •-\t") for l in text.splitlines() if l and l.strip()]
-    bullets = [l for l in lines if re.match(r"^(\d+[\).\s]|[-*•])", l)]
+    bullets = [l for l in lines if _RE_STEP.match(l)]
     arr = bullets if bullets else lines
     out = []
     for l in arr:
-        l = re.sub(r"^\d+[\).\s]+", "", l)
-        l = re.sub(r"^[-*•]\s*", "", l)
+        l = _RE_NUM_PREFIX.sub("", l)
+        l = _RE_BULLET_PREFIX.sub("", l)
         out.append(l[:220])
         if len(out) >= max_steps:
             break
@@ -2,9 +2,21 @@
 from __future__ import annotations
 
 import os
-from typing import Optional, Dict, Any
+import threading
+from functools import lru_cache
+from typing import Optional, Dict, Any, List, Tuple
+from urllib.parse import quote
 import asyncio
+import atexit
+import httpx
+import orjson
 import requests
+from loguru import logger
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from .config import HTTP2_AVAILABLE
+from .ttl_cache import TTLCache
 
 
 class TeamsGraphError(RuntimeError):
@@ -13,6 +25,77 @@ class TeamsGraphError(RuntimeError):
 
 GRAPH = "https://graph.microsoft.com/v1.0"
 
+# Sessão compartilhada: reaproveita conexões TLS com login.microsoftonline.com
+# e graph.microsoft.com entre chamadas (um notify faz várias requisições).
+def _adapter(methods: List[str]) -> HTTPAdapter:
+    return HTTPAdapter(
+        pool_connections=8,
+        pool_maxsize=16,
+        max_retries=Retry(
+            total=3,
+            backoff_factor=0.3,
+            backoff_max=5,
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=methods,
+            # Retry-After do Graph pode pedir minutos: não dormimos isso dentro da thread da requisição
+            respect_retry_after_header=False,
+            raise_on_status=False,  # devolve a última resposta; quem chama trata o status
+        ),
+    )
+
+
+_SESSION = requests.Session()
+# Graph: só GET é repetido (POST de instalação do app e $batch não são idempotentes)
+_SESSION.mount("https://", _adapter(["GET"]))
+# Token (client_credentials) é um POST idempotente: pode ser repetido
+_SESSION.mount("https://login.microsoftonline.com/", _adapter(["GET", "POST"]))
+atexit.register(_SESSION.close)
+
+
+# Cliente assíncrono para o caminho usado por endpoints async (anotify_user_for_ticket).
+# Vive no event loop da aplicação (FastAPI); não usar a partir de asyncio.run avulso.
+def _new_async_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        http2=HTTP2_AVAILABLE,
+        timeout=30,
+        limits=httpx.Limits(max_keepalive_connections=16),
+    )
+
+
+_AHTTP = _new_async_client()
+
+
+def _ahttp() -> httpx.AsyncClient:
+    global _AHTTP
+    if _AHTTP.is_closed:
+        _AHTTP = _new_async_client()
+    return _AHTTP
+
+
+async def aclose_http() -> None:
+    """Fecha o cliente async no shutdown da aplicação (o sync fecha via atexit)."""
+    await _AHTTP.aclose()
+
+# Cache de access tokens (AAD): (tenant, client, scope) -> token.
+# Cada token expira 60s antes do seu expires_in para não usar token prestes a vencer.
+_TOKEN_CACHE: TTLCache[str] = TTLCache(ttl=None, maxsize=64)
+_TOKEN_SKEW = 60.0
+
+
+def _cached_token(key: Tuple[str, ...]) -> Optional[str]:
+    return _TOKEN_CACHE.get(key)
+
+
+def _store_token(key: Tuple[str, ...], body: Dict[str, Any]) -> str:
+    tok = body["access_token"]
+    try:
+        ttl = float(body.get("expires_in") or 0) - _TOKEN_SKEW
+    except (TypeError, ValueError):
+        ttl = 0.0
+    if ttl > 0:
+        _TOKEN_CACHE.set(key, tok, ttl=ttl)
+    return tok
+
 
 # ---------------- Utils/env ----------------
 
@@ -23,38 +106,50 @@ def _env(*keys: str, default: str = "") -> str:
             return v
     return default
 
-# ----- Getters dinâmicos (evita cache no import) -----
+# ----- Getters de configuração -----
+# Lidos na primeira chamada (depois do load_dotenv da aplicação), não no import,
+# e memorizados; reload_env() descarta os valores após mudar o ambiente.
 
+@lru_cache(maxsize=1)
 def _get_tenant_id() -> str:
     return _env("MS_TENANT_ID", "MICROSOFT_APP_TENANT_ID", "TENANT_ID", "AZURE_TENANT_ID")
 
+@lru_cache(maxsize=1)
 def _get_graph_client_id() -> str:
     return _env("MS_CLIENT_ID", "TEAMS_CLIENT_ID", "BOT_APP_ID", "MICROSOFT_APP_ID")
 
+@lru_cache(maxsize=1)
 def _get_graph_client_secret() -> str:
     return _env("MS_CLIENT_SECRET", "TEAMS_CLIENT_SECRET", "BOT_APP_PASSWORD", "MICROSOFT_APP_PASSWORD")
 
+@lru_cache(maxsize=1)
 def _get_bot_app_id() -> str:
     return _env("BOT_APP_ID", "MICROSOFT_APP_ID", "MS_CLIENT_ID")
 
+@lru_cache(maxsize=1)
 def _get_bot_app_password() -> str:
     return _env("BOT_APP_PASSWORD", "MICROSOFT_APP_PASSWORD", "MS_CLIENT_SECRET")
 
+@lru_cache(maxsize=1)
 def _get_teams_app_id() -> str:
     return (os.getenv("TEAMS_APP_ID") or "").strip()
 
+@lru_cache(maxsize=1)
 def _get_service_url() -> str:
     return os.getenv("TEAMS_SERVICE_URL", "https://smba.trafficmanager.net/teams/")
 
+@lru_cache(maxsize=1)
 def _get_oauth_scope() -> str:
     return os.getenv("MICROSOFT_OAUTH_SCOPE", "https://api.botframework.com/.default")
 
+@lru_cache(maxsize=1)
 def _get_app_type() -> str:
     at = (os.getenv("MICROSOFT_APP_TYPE") or os.getenv("BOT_APP_TYPE") or "").strip()
     if at:
         return at
     return "SingleTenant" if _get_tenant_id() else "MultiTenant"
 
+@lru_cache(maxsize=1)
 def _get_bot_authority() -> str:
     app_type = _get_app_type().lower()
     if app_type == "singletenant":
@@ -65,9 +160,31 @@ def _get_bot_authority() -> str:
     return "https://login.microsoftonline.com/botframework.com/oauth2/v2.0/token"
 
 
+def reload_env() -> None:
+    """Relê as variáveis de ambiente nos próximos acessos (testes / reload a quente)."""
+    for f in (
+        _get_tenant_id,
+        _get_graph_client_id,
+        _get_graph_client_secret,
+        _get_bot_app_id,
+        _get_bot_app_password,
+        _get_teams_app_id,
+        _get_service_url,
+        _get_oauth_scope,
+        _get_app_type,
+        _get_bot_authority,
+    ):
+        f.cache_clear()
+
+
 # ---------------- HTTP helpers ----------------
 
-def _token(scope: str = "https://graph.microsoft.com/.default") -> str:
+def _json(r) -> Any:
+    """Decodifica o corpo (requests ou httpx) com orjson."""
+    return orjson.loads(r.content)
+
+
+def _token(scope: str = "https://graph.microsoft.com/.default", force_refresh: bool = False) -> str:
     tenant_id = _get_tenant_id()
     client_id = _get_graph_client_id()
     client_secret = _get_graph_client_secret()
@@ -77,6 +194,12 @@ def _token(scope: str = "https://graph.microsoft.com/.default") -> str:
             "Credenciais do Graph ausentes. Defina MS_TENANT_ID, MS_CLIENT_ID e MS_CLIENT_SECRET "
             "(ou equivalentes BOT_APP_ID/BOT_APP_PASSWORD/MICROSOFT_APP_*)."
         )
+    key = (tenant_id, client_id, scope)
+    if force_refresh:
+        _TOKEN_CACHE.pop(key)
+    cached = _cached_token(key)
+    if cached:
+        return cached
     data = {
         "client_id": client_id,
         "client_secret": client_secret,
@@ -84,70 +207,194 @@ def _token(scope: str = "https://graph.microsoft.com/.default") -> str:
         "grant_type": "client_credentials",
     }
     url = f"https://login.microsoftonline.com/{tenant_id}/oauth2/v2.0/token"
-    r = requests.post(url, data=data, timeout=30)
+    r = _SESSION.post(url, data=data, timeout=30)
     if r.status_code != 200:
         raise TeamsGraphError(f"Falha ao obter token: {r.status_code} {r.text}")
-    return r.json()["access_token"]
+    return _store_token(key, _json(r))
+
+
+# Serializa a renovação do token no caminho async: várias notificações simultâneas
+# esperam uma única ida ao login.microsoftonline.com em vez de dispararem uma cada.
+_ATOKEN_LOCK = asyncio.Lock()
+
+
+async def _atoken(scope: str = "https://graph.microsoft.com/.default", force_refresh: bool = False) -> str:
+    if not force_refresh:
+        cached = _cached_token((_get_tenant_id(), _get_graph_client_id(), scope))
+        if cached:
+            return cached
+    async with _ATOKEN_LOCK:
+        # _token é bloqueante (requests): roda fora do event loop
+        return await asyncio.to_thread(_token, scope, force_refresh)
+
+
+# Só nas chamadas ao Graph (não na sessão): o POST de token é form-urlencoded.
+_GRAPH_HEADERS = {"Content-Type": "application/json"}
 
 
 def _g(method: str, url: str, token: str, **kwargs) -> requests.Response:
-    headers = kwargs.pop("headers", {})
-    headers["Authorization"] = f"Bearer {token}"
-    headers.setdefault("Content-Type", "application/json")
-    return requests.request(method, url, headers=headers, timeout=30, **kwargs)
+    extra = kwargs.pop("headers", {})
+    headers = {**_GRAPH_HEADERS, **extra, "Authorization": f"Bearer {token}"}
+    r = _SESSION.request(method, url, headers=headers, timeout=30, **kwargs)
+    if r.status_code == 401:
+        # token em cache revogado/expirado antes da hora: renova uma vez e repete
+        fresh = _token(force_refresh=True)
+        if fresh != token:
+            headers["Authorization"] = f"Bearer {fresh}"
+            r = _SESSION.request(method, url, headers=headers, timeout=30, **kwargs)
+    return r
+
+
+async def _ag(method: str, url: str, token: str, **kwargs) -> httpx.Response:
+    extra = kwargs.pop("headers", {})
+    headers = {**_GRAPH_HEADERS, **extra, "Authorization": f"Bearer {token}"}
+    r = await _ahttp().request(method, url, headers=headers, **kwargs)
+    if r.status_code == 401:
+        fresh = await _atoken(force_refresh=True)
+        if fresh != token:
+            headers["Authorization"] = f"Bearer {fresh}"
+            r = await _ahttp().request(method, url, headers=headers, **kwargs)
+    return r
+
+
+
+def _graph_batch(token: str, reqs: List[Dict[str, Any]]) -> Optional[Dict[str, Dict[str, Any]]]:
+    """
+    Envia até 20 requisições num único POST /$batch (uma ida e volta).
+    Retorna {id: {"status": int, "body": ...}} ou None se o batch em si falhar.
+    """
+    r = _g("POST", f"{GRAPH}/$batch", token, data=orjson.dumps({"requests": reqs}))
+    if r.status_code != 200:
+        return None
+    out: Dict[str, Dict[str, Any]] = {}
+    for it in _json(r).get("responses", []):
+        out[str(it.get("id"))] = {"status": int(it.get("status") or 0), "body": it.get("body") or {}}
+    return out
 
 
 # ---------------- Usuários (Graph) ----------------
 
+def _odata_str(value: str) -> str:
+    """Literal OData ('' escapa apóstrofo) já codificado para ir na query string."""
+    return quote(value.replace("'", "''"), safe="")
+
+
+def _user_path(email: str) -> str:
+    """Segmento de path /users/{email} com +, espaço etc. codificados."""
+    return quote(email, safe="@.")
+
+
+# Cache de usuários resolvidos: e-mail (lower) -> usuário, por 10 min.
+# Só guarda resultados com id, para não fixar um "não encontrado" transitório.
+_USER_CACHE: TTLCache[Dict[str, Any]] = TTLCache(ttl=600.0, maxsize=2048)
+
+
+def _cached_user(email: str) -> Optional[Dict[str, Any]]:
+    hit = _USER_CACHE.get(email.strip().lower())
+    return dict(hit) if hit else None
+
+
+def _store_user(email: str, user: Dict[str, Any]) -> Dict[str, Any]:
+    if user.get("id"):
+        _USER_CACHE.set(email.strip().lower(), dict(user))
+    return user
+
+
+def clear_user_cache() -> None:
+    _USER_CACHE.clear()
+
+
 def get_user_id_by_mail(email: str) -> Optional[str]:
-    t = _token()
-    r1 = _g("GET", f"{GRAPH}/users?$filter=mail eq '{email}'&$select=id", t)
-    if r1.status_code != 200:
-        raise TeamsGraphError(f"Falha ao buscar usuário (mail): {r1.status_code} {r1.text}")
-    v1 = r1.json().get("value", [])
-    if v1:
-        return v1[0].get("id")
+    return (get_user_by_email(email) or {}).get("id")
 
-    r2 = _g("GET", f"{GRAPH}/users/{email}?$select=id", t)
-    if r2.status_code == 200:
-        return r2.json().get("id")
 
-    return None
+_USER_SELECT = "$select=id,mail,userPrincipalName,displayName,accountEnabled"
 
 
-def get_user_by_email(email: str) -> Dict[str, Any]:
-    t = _token()
-    r1 = _g("GET", f"{GRAPH}/users?$filter=mail eq '{email}'&$select=id,mail,userPrincipalName,displayName,accountEnabled", t)
-    if r1.status_code == 200:
-        v = r1.json().get("value", [])
+def _user_dict(u: Dict[str, Any], email: str) -> Dict[str, Any]:
+    return {
+        "id": u.get("id"),
+        "mail": u.get("mail") or email,
+        "userPrincipalName": u.get("userPrincipalName") or email,
+        "displayName": u.get("displayName"),
+        "accountEnabled": u.get("accountEnabled"),
+    }
+
+
+def _user_filter_query(email: str) -> str:
+    """Uma única consulta cobrindo mail e UPN (tenants sem 'mail' preenchido); relativa à versão."""
+    e = _odata_str(email)
+    return f"/users?$filter=mail eq '{e}' or userPrincipalName eq '{e}'&$top=1&{_USER_SELECT}"
+
+
+def _user_filter_url(email: str) -> str:
+    return f"{GRAPH}{_user_filter_query(email)}"
+
+
+def _user_from_responses(email: str, r1, r2) -> Dict[str, Any]:
+    """Escolhe o resultado do $filter (r1) e, se vazio, o do path /users/{email} (r2)."""
+    if r1 is not None and r1.status_code == 200:
+        v = _json(r1).get("value", [])
         if v:
-            u = v[0]
-            return {
-                "id": u.get("id"),
-                "mail": u.get("mail") or email,
-                "userPrincipalName": u.get("userPrincipalName") or email,
-                "displayName": u.get("displayName"),
-                "accountEnabled": u.get("accountEnabled"),
-            }
-    r2 = _g("GET", f"{GRAPH}/users/{email}?$select=id,mail,userPrincipalName,displayName,accountEnabled", t)
-    if r2.status_code == 200:
-        u = r2.json()
-        return {
-            "id": u.get("id"),
-            "mail": u.get("mail") or email,
-            "userPrincipalName": u.get("userPrincipalName") or email,
-            "displayName": u.get("displayName"),
-            "accountEnabled": u.get("accountEnabled"),
-        }
+            return _user_dict(v[0], email)
+    if r2 is not None and r2.status_code == 200:
+        return _user_dict(_json(r2), email)
     return {"id": None, "mail": email, "userPrincipalName": email, "displayName": None, "accountEnabled": None}
 
 
+def get_user_by_email(email: str) -> Dict[str, Any]:
+    cached = _cached_user(email)
+    if cached:
+        return cached
+    t = _token()
+    r1 = _g("GET", _user_filter_url(email), t)
+    user = _user_from_responses(email, r1, None)
+    if not user["id"]:
+        # último recurso (ex.: object id passado no lugar do e-mail)
+        r2 = _g("GET", f"{GRAPH}/users/{_user_path(email)}?{_USER_SELECT}", t)
+        user = _user_from_responses(email, None, r2)
+    return _store_user(email, user)
+
+
+async def _aget_user_by_email(email: str) -> Dict[str, Any]:
+    """Versão async de get_user_by_email (não bloqueia o event loop)."""
+    cached = _cached_user(email)
+    if cached:
+        return cached
+    t = await _atoken()
+    r1 = await _ag("GET", _user_filter_url(email), t)
+    user = _user_from_responses(email, r1, None)
+    if not user["id"]:
+        r2 = await _ag("GET", f"{GRAPH}/users/{_user_path(email)}?{_USER_SELECT}", t)
+        user = _user_from_responses(email, None, r2)
+    return _store_user(email, user)
+
+
 # ---------------- Instalação do app pessoal (Graph) ----------------
 
+# (usuário, app) confirmados como instalados: evita o GET a cada notify.
+# Expira em 10 min e é descartado se o envio proativo falhar (app pode ter sido removida).
+_INSTALLED: TTLCache[bool] = TTLCache(ttl=600.0, maxsize=4096)
+
+
+def _is_installed(user_ref: str, teams_app_id: str) -> bool:
+    return bool(_INSTALLED.get((user_ref, teams_app_id)))
+
+
+def _mark_installed(user_ref: str, teams_app_id: str) -> None:
+    _INSTALLED.set((user_ref, teams_app_id), True)
+
+
+def _forget_installed(user_ref: str) -> None:
+    _INSTALLED.discard_where(lambda key: key[0] == user_ref)
+
+
 def ensure_app_installed_for_user(user_ref: str, by: str = "id") -> None:
     teams_app_id = _get_teams_app_id()
     if not teams_app_id:
         return
+    if _is_installed(user_ref, teams_app_id):
+        return
 
     t = _token()
     if by not in ("id", "upn"):
@@ -156,19 +403,92 @@ def ensure_app_installed_for_user(user_ref: str, by: str = "id") -> None:
     target = user_ref if by == "id" else user_ref
     url = f"{GRAPH}/users/{target}/teamwork/installedApps"
     if by == "upn":
-        url = f"{GRAPH}/users/{user_ref}/teamwork/installedApps"
+        url = f"{GRAPH}/users/{_user_path(user_ref)}/teamwork/installedApps"
 
     r = _g("GET", f"{url}?$expand=teamsApp", t)
     if r.status_code == 200:
-        for it in r.json().get("value", []):
+        for it in _json(r).get("value", []):
             app = (it.get("teamsApp") or {})
             if app.get("id") == teams_app_id:
+                _mark_installed(user_ref, teams_app_id)
                 return
 
+    _install_app(url, user_ref, teams_app_id, t)
+
+
+def _install_app(url: str, user_ref: str, teams_app_id: str, t: str) -> None:
+    """POST de instalação do app pessoal em {url} (…/users/{ref}/teamwork/installedApps)."""
     body = {"teamsApp@odata.bind": f"{GRAPH}/appCatalogs/teamsApps/{teams_app_id}"}
-    r2 = _g("POST", url, t, json=body)
+    r2 = _g("POST", url, t, data=orjson.dumps(body))
     if r2.status_code not in (200, 201, 202, 204):
         raise TeamsGraphError(f"Falha ao instalar app pessoal para o usuário {user_ref}: {r2.status_code} {r2.text}")
+    _mark_installed(user_ref, teams_app_id)
+
+
+async def _aensure_app_installed_for_user(user_id: str) -> None:
+    teams_app_id = _get_teams_app_id()
+    if not teams_app_id:
+        return
+    if _is_installed(user_id, teams_app_id):
+        return
+
+    t = await _atoken()
+    url = f"{GRAPH}/users/{user_id}/teamwork/installedApps"
+    r = await _ag("GET", f"{url}?$expand=teamsApp", t)
+    if r.status_code == 200:
+        for it in _json(r).get("value", []):
+            if (it.get("teamsApp") or {}).get("id") == teams_app_id:
+                _mark_installed(user_id, teams_app_id)
+                return
+
+    body = {"teamsApp@odata.bind": f"{GRAPH}/appCatalogs/teamsApps/{teams_app_id}"}
+    r2 = await _ag("POST", url, t, content=orjson.dumps(body))
+    if r2.status_code not in (200, 201, 202, 204):
+        raise TeamsGraphError(f"Falha ao instalar app pessoal para o usuário {user_id}: {r2.status_code} {r2.text}")
+    _mark_installed(user_id, teams_app_id)
+
+
+def _user_and_install_state(email: str, teams_app_id: str) -> Tuple[Dict[str, Any], Optional[bool]]:
+    """
+    Caminho frio do notify: resolve o usuário e lê os apps instalados num único $batch.
+    O batch traz as mesmas consultas de get_user_by_email ($filter e, como último recurso,
+    /users/{email}) e vale como resposta final: só cai nas chamadas em sequência se o
+    batch em si falhar (transporte ou status do POST) ou se o $filter não responder 200.
+    installedApps vai pelo path /users/{email}, então só vale quando o e-mail é o UPN
+    do usuário encontrado; caso contrário o estado fica None (desconhecido).
+    """
+    t = _token()
+    try:
+        res = _graph_batch(t, [
+            {"id": "user", "method": "GET", "url": _user_filter_query(email)},
+            {"id": "path", "method": "GET", "url": f"/users/{_user_path(email)}?{_USER_SELECT}"},
+            {"id": "apps", "method": "GET", "url": f"/users/{_user_path(email)}/teamwork/installedApps?$expand=teamsApp"},
+        ])
+    except Exception as e:
+        logger.warning(f"[GRAPH] $batch falhou, seguindo com chamadas avulsas: {e}")
+        res = None
+    found = (res or {}).get("user") or {}
+    if found.get("status") != 200:
+        return get_user_by_email(email), None
+
+    values = (found.get("body") or {}).get("value") or []
+    by_path = res.get("path") or {}
+    if values:
+        user = _user_dict(values[0], email)
+    elif by_path.get("status") == 200:
+        user = _user_dict(by_path.get("body") or {}, email)
+    else:
+        user = {"id": None, "mail": email, "userPrincipalName": email, "displayName": None, "accountEnabled": None}
+    user = _store_user(email, user)
+
+    installed: Optional[bool] = None
+    apps = res.get("apps") or {}
+    if user.get("id") and apps.get("status") == 200 and (user.get("userPrincipalName") or "").lower() == email.strip().lower():
+        installed = any(
+            (it.get("teamsApp") or {}).get("id") == teams_app_id
+            for it in (apps.get("body") or {}).get("value", [])
+        )
+    return user, installed
 
 
 # ---------------- Diagnóstico ----------------
@@ -178,8 +498,9 @@ def diag_token_info() -> Dict[str, Any]:
         t = _token()
         r = _g("GET", f"{GRAPH}/organization?$select=id,displayName", t)
         org = None
-        if r.status_code == 200 and r.json().get("value"):
-            org = r.json()["value"][0]
+        vals = _json(r).get("value") if r.status_code == 200 else None
+        if vals:
+            org = vals[0]
         cid = _get_graph_client_id()
         return {
             "tenant_id": _get_tenant_id(),
@@ -227,7 +548,7 @@ def diag_user_installed_apps(email: str) -> Dict[str, Any]:
     url = f"{GRAPH}/users/{uid}/teamwork/installedApps?$expand=teamsApp"
     r = _g("GET", url, t)
     if r.status_code == 200:
-        vals = r.json().get("value", [])
+        vals = _json(r).get("value", [])
         apps = []
         for it in vals:
             app = (it.get("teamsApp") or {})
@@ -256,6 +577,48 @@ def _ensure_bot_creds():
     if not _get_bot_app_id() or not _get_bot_app_password():
         raise TeamsGraphError("BOT_APP_ID/BOT_APP_PASSWORD ausentes no ambiente.")
 
+
+# Loop de fundo de longa duração para o Bot Framework: o ConnectorClient (sessão
+# aiohttp) e as credenciais (token em cache) ficam presos a ele e são reaproveitados.
+_BOT_LOOP: Optional[asyncio.AbstractEventLoop] = None
+_BOT_LOOP_LOCK = threading.Lock()
+_CREDS_CACHE: Dict[Tuple[Any, ...], Any] = {}
+_CONNECTOR_CACHE: Dict[Tuple[Any, ...], Any] = {}
+
+# Índice da variante de membro que funcionou por último em cada tenant (tentada primeiro).
+_VARIANT_PREF: Dict[str, int] = {}
+_VARIANT_LOCK = threading.Lock()
+
+
+def _bot_loop() -> asyncio.AbstractEventLoop:
+    global _BOT_LOOP
+    with _BOT_LOOP_LOCK:
+        if _BOT_LOOP is None or _BOT_LOOP.is_closed():
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="teams-bot-loop", daemon=True).start()
+            _BOT_LOOP = loop
+        return _BOT_LOOP
+
+
+def _bot_connector(service_url: str, bot_app_id: str, bot_app_password: str, channel_auth_tenant: Optional[str]):
+    """Credenciais e ConnectorClient únicos por configuração; usar só dentro de _BOT_LOOP."""
+    creds_key = (bot_app_id, channel_auth_tenant, _get_oauth_scope())
+    creds = _CREDS_CACHE.get(creds_key)
+    if creds is None:
+        creds = MicrosoftAppCredentials(
+            bot_app_id,
+            bot_app_password,
+            channel_auth_tenant=channel_auth_tenant,
+            oauth_scope=creds_key[2],
+        )
+        _CREDS_CACHE[creds_key] = creds
+    conn_key = (service_url,) + creds_key
+    connector = _CONNECTOR_CACHE.get(conn_key)
+    if connector is None:
+        connector = ConnectorClient(credentials=creds, base_url=service_url)
+        _CONNECTOR_CACHE[conn_key] = connector
+    return connector
+
 async def send_proactive_via_bot(aad_object_id: str, tenant_id: str, text: str) -> str:
     """
     Cria uma conversa 1:1 e envia a primeira mensagem usando o Bot Framework (Teams).
@@ -280,13 +643,7 @@ async def send_proactive_via_bot(aad_object_id: str, tenant_id: str, text: str)
         pass
 
     channel_auth_tenant = _get_tenant_id() if app_type == "singletenant" else None
-    creds = MicrosoftAppCredentials(
-        bot_app_id,
-        bot_app_password,
-        channel_auth_tenant=channel_auth_tenant,
-        oauth_scope=_get_oauth_scope(),
-    )
-    connector = ConnectorClient(credentials=creds, base_url=service_url)
+    connector = _bot_connector(service_url, bot_app_id, bot_app_password, channel_auth_tenant)
 
     # Variantes para identificar o membro (evita "User id can't be null")
     member_variants = [
@@ -303,8 +660,12 @@ async def send_proactive_via_bot(aad_object_id: str, tenant_id: str, text: str)
         from_property=ChannelAccount(id=bot_app_id),
     )
 
+    pref = _VARIANT_PREF.get(tenant_id, 0) % len(member_variants)
+    order = list(range(pref, len(member_variants))) + list(range(pref))
+
     last_err: Exception | None = None
-    for m in member_variants:
+    for idx in order:
+        m = member_variants[idx]
         params = ConversationParameters(
             is_group=False,
             bot=ChannelAccount(id=bot_app_id),
@@ -329,51 +690,144 @@ async def send_proactive_via_bot(aad_object_id: str, tenant_id: str, text: str)
 
             # 🚀 envio explícito (garante entrega)
             await connector.conversations.send_to_conversation(conv_id, followup_activity)
+            if idx != pref:
+                with _VARIANT_LOCK:
+                    _VARIANT_PREF[tenant_id] = idx
             return conv_id
         except Exception as e:
             last_err = e
             continue
 
+    _forget_installed(aad_object_id)
     raise TeamsGraphError(f"Falha ao criar/enviar no chat 1:1 do Teams. Último erro: {last_err!r}")
 
 
+def _log_bg_error(fut) -> None:
+    if not fut.cancelled() and fut.exception() is not None:
+        logger.warning(f"[teams] envio proativo falhou em segundo plano: {fut.exception()!r}")
+
+
 def _run_coro_bg(coro) -> None:
     """
-    Se já estamos dentro de um event loop (ex.: FastAPI), agenda a tarefa.
-    Caso contrário, cria um loop só para esta chamada (CLI, scripts).
+    Executa a corrotina no loop de fundo do bot (_BOT_LOOP).
+    Dentro de um event loop (ex.: FastAPI) não bloqueia: só agenda e registra falhas.
+    Fora dele (CLI, scripts, threads), espera o resultado e propaga o erro.
+    Nunca usar asyncio.run aqui: quebra quando já existe um loop rodando.
     """
+    fut = asyncio.run_coroutine_threadsafe(coro, _bot_loop())
     try:
-        loop = asyncio.get_running_loop()
+        asyncio.get_running_loop()
     except RuntimeError:
-        asyncio.run(coro)
+        fut.result()
     else:
-        loop.create_task(coro)
+        fut.add_done_callback(_log_bg_error)
 
 # ---------------- API pública principal ----------------
 
-def notify_user_for_ticket(user_email: str, ticket_id: int, subject: str, preview_text: Optional[str] = None) -> Optional[str]:
-    user = get_user_by_email(user_email)
+def _notify_tenant_id() -> str:
+    tenant_id = _get_tenant_id() or os.getenv("AZURE_TENANT_ID") or os.getenv("TENANT_ID")
+    if not tenant_id:
+        raise TeamsGraphError("MS_TENANT_ID ausente no ambiente.")
+    return tenant_id
+
+
+def _notify_text(user_email: str, ticket_id: int, subject: str, preview_text: Optional[str]) -> str:
+    first_name = (user_email.split("@", 1)[0]).split(".")[0].title()
+    return preview_text or f"Olá {first_name}! Recebemos seu chamado #{ticket_id} sobre “{subject}”. Posso ajudar agora?"
+
+
+def _prepare_notify(user_email: str, ticket_id: int, subject: str, preview_text: Optional[str]) -> Tuple[str, str, str]:
+    """Parte Graph do notify: resolve o usuário, garante o app e monta (user_id, tenant_id, texto)."""
+    teams_app_id = _get_teams_app_id()
+    installed: Optional[bool] = None
+    if teams_app_id and not _cached_user(user_email):
+        user, installed = _user_and_install_state(user_email, teams_app_id)
+    else:
+        user = get_user_by_email(user_email)
     user_id = user.get("id")
     if not user_id:
         raise TeamsGraphError(f"Usuário não encontrado no Graph para: {user_email}")
-
     try:
-        ensure_app_installed_for_user(user_id, by="id")
+        if installed:
+            _mark_installed(user_id, teams_app_id)
+        elif installed is False:
+            # o batch já listou os apps: instala direto, sem repetir o GET
+            _install_app(f"{GRAPH}/users/{user_id}/teamwork/installedApps", user_id, teams_app_id, _token())
+        else:
+            ensure_app_installed_for_user(user_id, by="id")
     except Exception:
         pass  # app já pode estar instalada
 
-    tenant_id = _get_tenant_id() or os.getenv("AZURE_TENANT_ID") or os.getenv("TENANT_ID")
-    if not tenant_id:
-        raise TeamsGraphError("MS_TENANT_ID ausente no ambiente.")
+    tenant_id = _notify_tenant_id()
+    text = _notify_text(user_email, ticket_id, subject, preview_text)
+    return user_id, tenant_id, text
 
-    first_name = (user_email.split("@", 1)[0]).split(".")[0].title()
-    text = preview_text or f"Olá {first_name}! Recebemos seu chamado #{ticket_id} sobre “{subject}”. Posso ajudar agora?"
+
+def notify_user_for_ticket(user_email: str, ticket_id: int, subject: str, preview_text: Optional[str] = None) -> Optional[str]:
+    user_id, tenant_id, text = _prepare_notify(user_email, ticket_id, subject, preview_text)
 
     # 👇 antes: asyncio.run(...). Agora: seguro em endpoints async.
     _run_coro_bg(send_proactive_via_bot(user_id, tenant_id, text))
     return user_id
 
 
+def notify_users_for_tickets(items: List[Dict[str, Any]]) -> List[Any]:
+    """
+    Notifica vários usuários de uma vez (ex.: lote de follow-ups).
+    Cada item: {"user_email", "ticket_id", "subject", "preview_text"(opcional)}.
+    A parte Graph roda em sequência (quase sempre em cache); os envios do bot
+    vão juntos para o loop de fundo com asyncio.gather, em vez de um por vez.
+    Retorna, na mesma ordem, o user_id de cada item ou a exceção que ele gerou.
+    Para uso fora de event loop (jobs, threads, rotas sync).
+    """
+    results: List[Any] = [None] * len(items)
+    sends = []
+    for i, it in enumerate(items):
+        try:
+            user_id, tenant_id, text = _prepare_notify(
+                it["user_email"], int(it.get("ticket_id") or 0), str(it.get("subject") or ""), it.get("preview_text")
+            )
+        except Exception as e:
+            results[i] = e
+            continue
+        results[i] = user_id
+        sends.append((i, send_proactive_via_bot(user_id, tenant_id, text)))
+
+    if sends:
+        async def _gather():
+            return await asyncio.gather(*(coro for _, coro in sends), return_exceptions=True)
+
+        outcomes = asyncio.run_coroutine_threadsafe(_gather(), _bot_loop()).result()
+        for (i, _), outcome in zip(sends, outcomes):
+            if isinstance(outcome, BaseException):
+                results[i] = outcome
+    return results
+
+
+async def anotify_user_for_ticket(user_email: str, ticket_id: int, subject: str, preview_text: Optional[str] = None) -> Optional[str]:
+    """
+    Equivalente async de notify_user_for_ticket para endpoints async: as chamadas
+    ao Graph não bloqueiam o event loop. Em rotas `async def`, use esta versão;
+    notify_user_for_ticket (requests) fica para rotas sync, jobs e threads.
+    A instalação do app continua antes do envio, pois o bot precisa dela para abrir o 1:1.
+    """
+    user = await _aget_user_by_email(user_email)
+    user_id = user.get("id")
+    if not user_id:
+        raise TeamsGraphError(f"Usuário não encontrado no Graph para: {user_email}")
+
+    try:
+        await _aensure_app_installed_for_user(user_id)
+    except Exception:
+        pass  # app já pode estar instalada
+
+    tenant_id = _notify_tenant_id()
+    text = _notify_text(user_email, ticket_id, subject, preview_text)
+
+    _run_coro_bg(send_proactive_via_bot(user_id, tenant_id, text))
+    return user_id
+
+
 def send_proactive_message(user_email: str, text: str) -> bool:
     try:
         notify_user_for_ticket(user_email, 0, "Assistente N1", preview_text=text)
@@ -390,6 +844,7 @@ def _get_bot_token_or_die() -> Dict[str, Any]:
     if not app_id or not app_pw:
         return {"ok": False, "error": "BOT_APP_ID/BOT_APP_PASSWORD ausentes no ambiente."}
 
+    # Diagnóstico: sempre pede um token novo (sem cache) para validar o segredo atual.
     data = {
         "grant_type": "client_credentials",
         "client_id": app_id,
@@ -397,9 +852,9 @@ def _get_bot_token_or_die() -> Dict[str, Any]:
         "scope": _get_oauth_scope(),
     }
     url = _get_bot_authority()
-    r = requests.post(url, data=data, timeout=30)
+    r = _SESSION.post(url, data=data, timeout=30)
     try:
-        body = r.json()
+        body = _json(r)
     except Exception:
         body = {"raw": r.text}
 
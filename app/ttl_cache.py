@@ -0,0 +1,66 @@
+# app/ttl_cache.py
+from __future__ import annotations
+
+import threading
+import time
+from typing import Callable, Dict, Generic, Hashable, Optional, Tuple, TypeVar
+
+V = TypeVar("V")
+
+
+class TTLCache(Generic[V]):
+    """
+    Cache em memória com expiração (time.monotonic) e tamanho máximo, seguro entre threads.
+    - ttl=None: itens não expiram (só o limite de tamanho vale).
+    - set(..., ttl=x) permite expiração própria por item (ex.: expires_in de um token).
+    - Cheio: descarta primeiro os vencidos; se ainda faltar espaço, os mais antigos.
+    """
+
+    def __init__(self, ttl: Optional[float], maxsize: int = 1024) -> None:
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data: Dict[Hashable, Tuple[V, float]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[V]:
+        with self._lock:
+            hit = self._data.get(key)
+            if hit is None:
+                return None
+            if time.monotonic() >= hit[1]:
+                del self._data[key]
+                return None
+            return hit[0]
+
+    def set(self, key: Hashable, value: V, ttl: Optional[float] = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        expires = float("inf") if ttl is None else time.monotonic() + ttl
+        with self._lock:
+            self._data.pop(key, None)
+            if len(self._data) >= self.maxsize:
+                self._evict()
+            self._data[key] = (value, expires)
+
+    def _evict(self) -> None:
+        now = time.monotonic()
+        for key in [k for k, (_, exp) in self._data.items() if exp <= now]:
+            del self._data[key]
+        while len(self._data) >= self.maxsize:
+            del self._data[next(iter(self._data))]
+
+    def pop(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def discard_where(self, pred: Callable[[Hashable], bool]) -> None:
+        """Remove as chaves para as quais pred(chave) é verdadeiro."""
+        with self._lock:
+            for key in [k for k in self._data if pred(k)]:
+                del self._data[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
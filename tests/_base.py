@@ -0,0 +1,83 @@
+import sqlite3
+import threading
+import unittest
+from contextlib import contextmanager
+from unittest.mock import patch
+
+from app import db
+
+
+class SharedConnections:
+    """
+    Substituto de db.connect() para os testes: uma conexão por thread, aberta uma vez
+    e reaproveitada (sem fechar ao sair do `with`). Como o close() real, o `with`
+    desfaz qualquer transação deixada aberta.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._local = threading.local()
+        self._all: list[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False, uri=self.path.startswith("file:"))
+            self._local.conn = conn
+            with self._lock:
+                self._all.append(conn)
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+
+    def close_all(self) -> None:
+        with self._lock:
+            for conn in self._all:
+                conn.close()
+            self._all.clear()
+        self._local = threading.local()
+
+
+class TempDbTestCase(unittest.TestCase):
+    """
+    Base dos testes que usam o banco do app: um SQLite em memória (cache compartilhado)
+    por classe, schema criado uma vez, db.connect() servido por SharedConnections e
+    todas as tabelas esvaziadas no início de cada teste.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # a conexão "âncora" mantém o banco vivo entre os testes (sem arquivo temporário)
+        cls.temp_db_path = f"file:{cls.__name__}?mode=memory&cache=shared"
+        cls.anchor = sqlite3.connect(cls.temp_db_path, uri=True)
+        cls.old_db_path = db.DB_PATH
+        db.DB_PATH = cls.temp_db_path
+        db.init_db()
+        # db.connect() passa a reaproveitar uma conexão por thread em vez de abrir uma por chamada
+        cls.pool = SharedConnections(cls.temp_db_path)
+        cls.connect_patch = patch.object(db, "connect", cls.pool.connect)
+        cls.connect_patch.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.connect_patch.stop()
+        cls.pool.close_all()
+        db.DB_PATH = cls.old_db_path
+        cls.anchor.close()
+        super().tearDownClass()
+
+    def setUp(self):
+        super().setUp()
+        db.DB_PATH = self.temp_db_path
+        tables = [
+            row[0]
+            for row in self.anchor.execute(
+                "SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'"
+            )
+        ]
+        self.anchor.executescript("".join(f"DELETE FROM {t};" for t in tables))
@@ -1,10 +1,31 @@
+import functools
 import unittest
 from unittest import mock
 
+import httpx
+import orjson
+
 from app import session_movidesk
 
+_RealClient = httpx.Client
+
 
 class ChatDrivenMovideskTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # Transporte httpx em memória, criado uma vez por classe: dispatch real do httpx
+        # sem rede e sem MagicMock de context manager.
+        cls.requests = []
+
+        def handler(request):
+            cls.requests.append(request)
+            return httpx.Response(201, json={"id": 4321})
+
+        cls.transport = httpx.MockTransport(handler)
+
+    def setUp(self):
+        self.requests.clear()
+
     def test_build_summary_includes_subject_and_conversation(self):
         session = {"subject": "VPN", "last_intent": "vpn.access"}
         conversation = "Usuário: Olá\nBot: Siga estes passos"
@@ -14,27 +35,24 @@ class ChatDrivenMovideskTests(unittest.TestCase):
         self.assertIn("orientação resolveu o problema", summary.lower())
 
     @mock.patch("app.session_movidesk.add_public_note")
-    @mock.patch("app.session_movidesk.httpx.Client")
     @mock.patch("app.session_movidesk._get_token", return_value="token-123")
-    def test_create_ticket_success(self, mock_token, mock_client_cls, mock_add_note):
-        mock_client = mock.MagicMock()
-        mock_resp = mock.MagicMock(status_code=201)
-        mock_resp.json.return_value = {"id": 4321}
-        mock_client.__enter__.return_value = mock_client
-        mock_client.post.return_value = mock_resp
-        mock_client_cls.return_value = mock_client
-
-        session = {"id": 99, "user_email": "user@test.com", "subject": "Impressora"}
-        summary = "Resumo qualquer"
-        ticket_id = session_movidesk.create_resolved_movidesk_ticket_from_session(session, summary)
+    def test_create_ticket_success(self, mock_token, mock_add_note):
+        client_cls = functools.partial(_RealClient, transport=self.transport)
+        with mock.patch("app.session_movidesk.httpx.Client", client_cls):
+            session = {"id": 99, "user_email": "user@test.com", "subject": "Impressora"}
+            summary = "Resumo qualquer"
+            ticket_id = session_movidesk.create_resolved_movidesk_ticket_from_session(session, summary)
 
         self.assertEqual(ticket_id, "4321")
-        mock_client.post.assert_called_once()
-        payload = mock_client.post.call_args.kwargs["json"]
+        self.assertEqual(len(self.requests), 1)
+        request = self.requests[0]
+        self.assertEqual(request.method, "POST")
+        self.assertTrue(request.url.path.endswith("/tickets"))
+        self.assertEqual(request.url.params["token"], "token-123")
+        payload = orjson.loads(request.content)
         self.assertEqual(payload["clients"][0]["email"], "user@test.com")
         self.assertEqual(payload["status"], "Resolvido")
         mock_add_note.assert_called_once_with(4321, mock.ANY)
 
-
 if __name__ == "__main__":
     unittest.main()
@@ -1,26 +1,37 @@
-import os
 import sqlite3
 import unittest
-import tempfile
 
 from app import db
 
 
 class TelemetryDbTests(unittest.TestCase):
+    TEMPLATE_DB_PATH = "file:telemetry_template?mode=memory&cache=shared"
+
+    @classmethod
+    def setUpClass(cls):
+        # Schema criado uma única vez num banco "modelo"; cada teste recebe uma cópia
+        # (backup API) em vez de rodar init_db de novo.
+        cls.old_db_path = db.DB_PATH
+        cls.template = sqlite3.connect(cls.TEMPLATE_DB_PATH, uri=True)
+        db.DB_PATH = cls.TEMPLATE_DB_PATH
+        db.init_db()
+        db.DB_PATH = cls.old_db_path
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.template.close()
+
     def setUp(self):
-        fd, path = tempfile.mkstemp(prefix="telemetry_", suffix=".db")
-        os.close(fd)
-        self.temp_db_path = path
-        self.old_db_path = db.DB_PATH
+        # Banco em memória com cache compartilhado: as conexões abertas por db.connect()
+        # enxergam o mesmo banco enquanto a conexão "âncora" estiver aberta.
+        self.temp_db_path = f"file:telemetry_{self._testMethodName}?mode=memory&cache=shared"
+        self.anchor = sqlite3.connect(self.temp_db_path, uri=True)
+        self.template.backup(self.anchor)
         db.DB_PATH = self.temp_db_path
-        db.init_db()
 
     def tearDown(self):
         db.DB_PATH = self.old_db_path
-        try:
-            os.remove(self.temp_db_path)
-        except OSError:
-            pass
+        self.anchor.close()
 
     def test_log_ingest_event_stores_row(self):
         db.log_ingest_event(
@@ -30,7 +41,7 @@ class TelemetryDbTests(unittest.TestCase):
             ticket_id="12345",
             context={"step": "unit-test"},
         )
-        with sqlite3.connect(db.DB_PATH) as conn:
+        with sqlite3.connect(db.DB_PATH, uri=True) as conn:
             cur = conn.cursor()
             cur.execute("SELECT source, action, status, ticket_id, context FROM ingest_events;")
             row = cur.fetchone()
@@ -49,7 +60,7 @@ class TelemetryDbTests(unittest.TestCase):
             ticket_id=999,
             error_message="boom",
         )
-        with sqlite3.connect(db.DB_PATH) as conn:
+        with sqlite3.connect(db.DB_PATH, uri=True) as conn:
             cur = conn.cursor()
             cur.execute("SELECT status, error_message FROM ingest_events WHERE ticket_id='999';")
             row = cur.fetchone()
@@ -3,6 +3,8 @@ from pathlib import Path
 from tempfile import TemporaryDirectory
 from unittest.mock import patch
 
+from pydantic import ValidationError
+
 from app import kb
 from app.kb_admin import (
     KBArticleAlreadyExistsError,
@@ -23,8 +25,13 @@ class KBAdminTests(unittest.TestCase):
         self.kb_dir.mkdir(parents=True, exist_ok=True)
         self.patch = patch.object(kb, "KB_DIR", self.kb_dir)
         self.patch.start()
+        # o resumo do índice também vai para o diretório do teste: nada compartilhado
+        # entre processos (execução paralela) nem gravado em app/kb_index.json
+        self.index_patch = patch.object(kb, "KB_INDEX", self.kb_dir / "kb_index.json")
+        self.index_patch.start()
 
     def tearDown(self):
+        self.index_patch.stop()
         self.patch.stop()
         self.tmpdir.cleanup()
 
@@ -110,3 +117,53 @@ class KBAdminTests(unittest.TestCase):
         stats = force_reindex()
         self.assertIn("docs", stats)
         self.assertGreaterEqual(stats.get("docs", 0), 1)
+
+    def test_force_reindex_only_rereads_changed_files(self):
+        for slug in ("kb_a", "kb_b"):
+            create_kb_article(
+                KBArticleCreate(slug=slug, titulo=slug, tags=[], ativo=True, conteudo_markdown="Texto inicial")
+            )
+        self.assertEqual(force_reindex()["reparsed"], 2)
+        self.assertEqual(force_reindex()["reparsed"], 0)
+
+        update_kb_article(
+            "kb_a",
+            KBArticleUpdate(slug="kb_a", titulo="kb_a", tags=[], ativo=True, conteudo_markdown="Texto novo e maior"),
+        )
+        stats = force_reindex()
+        self.assertEqual(stats["reparsed"], 1)
+        self.assertEqual(stats["docs"], 2)
+
+    def test_search_cache_is_invalidated_by_reindex(self):
+        create_kb_article(
+            KBArticleCreate(slug="vpn", titulo="VPN", tags=[], ativo=True, conteudo_markdown="Conectar na VPN corporativa")
+        )
+        force_reindex()
+        version = kb.KB_VERSION
+        first = kb.search("vpn corporativa", k=3, threshold=0.0)
+        self.assertEqual(len(first), 1)
+        self.assertEqual(kb.search("vpn corporativa", k=3, threshold=0.0), first)
+        first[0]["score"] = -1.0
+        self.assertNotEqual(kb.search("vpn corporativa", k=3, threshold=0.0)[0]["score"], -1.0)
+
+        create_kb_article(
+            KBArticleCreate(slug="vpn2", titulo="VPN 2", tags=[], ativo=True, conteudo_markdown="Outra VPN corporativa")
+        )
+        force_reindex()
+        self.assertGreater(kb.KB_VERSION, version)
+        self.assertEqual(len(kb.search("vpn corporativa", k=3, threshold=0.0)), 2)
+
+    def test_first_search_builds_the_index(self):
+        create_kb_article(
+            KBArticleCreate(slug="vpn", titulo="VPN", tags=[], ativo=True, conteudo_markdown="Conectar na VPN corporativa")
+        )
+        with patch.object(kb, "_INDEXED", False):
+            self.assertFalse((self.kb_dir / "kb_index.json").exists())
+            self.assertEqual(len(kb.search("vpn corporativa", k=3, threshold=0.0)), 1)
+            self.assertTrue(kb._INDEXED)
+        self.assertTrue((self.kb_dir / "kb_index.json").exists())
+
+    def test_invalid_slug_reports_portuguese_message(self):
+        with self.assertRaises(ValidationError) as ctx:
+            KBArticleCreate(slug="com espaço", titulo="X", tags=[], ativo=True, conteudo_markdown="")
+        self.assertIn("slug deve conter apenas letras minúsculas", str(ctx.exception))
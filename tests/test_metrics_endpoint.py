@@ -13,8 +13,11 @@ except Exception:  # pragma: no cover
 
 @unittest.skipIf(TestClient is None or app is None, "Dependências FastAPI não disponíveis no ambiente")
 class MetricsEndpointTests(unittest.TestCase):
-    def setUp(self):
-        self.client = TestClient(app)  # type: ignore
+    @classmethod
+    def setUpClass(cls):
+        # Um único cliente para a classe; sem `with`, os hooks de startup (init_db no banco
+        # real, watchdog de sessões) não rodam
+        cls.client = TestClient(app)  # type: ignore
 
     def test_debug_metrics_endpoint_returns_sections(self):
         resp = self.client.get("/debug/metrics")
@@ -0,0 +1,104 @@
+import unittest
+from unittest import mock
+
+from app import movidesk_client
+
+
+class _Resp:
+    def __init__(self, status_code, payload=None, text=""):
+        self.status_code = status_code
+        self._payload = payload
+        self.text = text
+
+    def json(self):
+        return self._payload
+
+
+def _fake_get(calls):
+    """Ticket 1 não tem ações (cai no html); os demais têm a primeira ação."""
+
+    def get(url, params=None, timeout=None):
+        path = url[len(movidesk_client.MOVIDESK_BASE):]
+        calls.append(path)
+        ticket_id = path.split("/")[2]
+        actions = [] if ticket_id == "1" else [{"description": "primeira acao"}]
+        if path.endswith("/htmldescription"):
+            return _Resp(200, text="<p>descricao html</p>")
+        if path.endswith("/actions"):
+            return _Resp(200, actions)
+        return _Resp(200, {"id": int(ticket_id), "subject": "Assunto", "actions": actions})
+
+    return get
+
+
+class TicketTextBundleTests(unittest.TestCase):
+    def setUp(self):
+        movidesk_client._SUCCESS_RECIPE.clear()
+        self.addCleanup(movidesk_client._SUCCESS_RECIPE.clear)
+        self.calls = []
+        for target, value in (
+            ("_get_token", mock.Mock(return_value="token")),
+            ("get_ticket_by_id", mock.Mock(return_value={"subject": "Assunto"})),
+        ):
+            patcher = mock.patch.object(movidesk_client, target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(movidesk_client._HTTP, "get", _fake_get(self.calls))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_html_fallback_is_not_memoized_for_next_ticket(self):
+        first = movidesk_client.get_ticket_text_bundle(1)
+        self.assertEqual(first["first_action_text"], "descricao html")
+
+        self.calls.clear()
+        second = movidesk_client.get_ticket_text_bundle(2)
+        self.assertEqual(second["first_action_text"], "primeira acao")
+        self.assertEqual(self.calls, ["/tickets/2"])
+
+
+class TicketByIdRecipeTests(unittest.TestCase):
+    def setUp(self):
+        movidesk_client._SUCCESS_RECIPE.clear()
+        self.addCleanup(movidesk_client._SUCCESS_RECIPE.clear)
+        patcher = mock.patch.object(movidesk_client, "_get_token", mock.Mock(return_value="token"))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_missing_ticket_keeps_the_learned_route(self):
+        # rota 3 (lista com filtro) aprendida; o ticket 404 não existe: todas respondem vazio
+        movidesk_client._SUCCESS_RECIPE["get_ticket_by_id"] = 3
+
+        def get(url, params=None, timeout=None):
+            return _Resp(200, [] if "$filter" in params else None)
+
+        with mock.patch.object(movidesk_client._HTTP, "get", get):
+            with self.assertRaises(movidesk_client.MovideskError):
+                movidesk_client.get_ticket_by_id.__wrapped__(404)
+        self.assertEqual(movidesk_client._SUCCESS_RECIPE.get("get_ticket_by_id"), 3)
+
+
+class RecentPageCacheTests(unittest.TestCase):
+    def setUp(self):
+        movidesk_client._SCAN_CACHE.clear()
+        self.addCleanup(movidesk_client._SCAN_CACHE.clear)
+
+    def test_failed_page_is_not_cached(self):
+        batch = mock.Mock(side_effect=[[], [{"id": 1}]])
+        with mock.patch.object(movidesk_client, "_list_recent_batch", batch):
+            self.assertEqual(movidesk_client._recent_page(100, False, True, 0), [])
+            self.assertEqual(movidesk_client._recent_page(100, False, True, 0), [{"id": 1}])
+        self.assertEqual(batch.call_count, 2)
+
+    def test_callers_get_copies_of_the_cached_page(self):
+        batch = mock.Mock(return_value=[{"id": 1}])
+        with mock.patch.object(movidesk_client, "_list_recent_batch", batch):
+            first = movidesk_client._recent_page(100, False, True, 0)
+            first[0]["id"] = 99
+            first.append({"id": 2})
+            self.assertEqual(movidesk_client._recent_page(100, False, True, 0), [{"id": 1}])
+        batch.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,11 +1,9 @@
 import asyncio
-import os
-import tempfile
 import unittest
-from types import SimpleNamespace
 from unittest.mock import patch
 
 from app import db
+from tests._base import TempDbTestCase
 
 try:
     from app.bot import N1Bot  # type: ignore
@@ -41,19 +39,42 @@ class DummyConversationState:
         return None
 
 
+class _FakeAccount:
+    __slots__ = ("id", "aad_object_id", "email", "name", "additional_properties")
+
+    def __init__(self, id: str, aad_object_id=None, email=None, name=None) -> None:
+        self.id = id
+        self.aad_object_id = aad_object_id
+        self.email = email
+        self.name = name
+        self.additional_properties: dict = {}
+
+
+class _FakeRecipient:
+    __slots__ = ("id",)
+
+    def __init__(self, id: str) -> None:
+        self.id = id
+
+
+class _FakeActivity:
+    __slots__ = ("text", "from_property", "recipient", "channel_data")
+
+    def __init__(self, text: str, from_property: _FakeAccount, recipient: _FakeRecipient) -> None:
+        self.text = text
+        self.from_property = from_property
+        self.recipient = recipient
+        self.channel_data: dict = {}
+
+
 class FakeTurnContext:
+    __slots__ = ("activity", "sent_messages")
+
     def __init__(self, text: str, user_id: str = "user-1", teams_id: str = "teams-user-1", email: str = "tester@example.com") -> None:
-        self.activity = SimpleNamespace(
-            text=text,
-            from_property=SimpleNamespace(
-                id=user_id,
-                aad_object_id=teams_id,
-                email=email,
-                name="Tester",
-                additional_properties={},
-            ),
-            recipient=SimpleNamespace(id="bot"),
-            channel_data={},
+        self.activity = _FakeActivity(
+            text,
+            from_property=_FakeAccount(user_id, aad_object_id=teams_id, email=email, name="Tester"),
+            recipient=_FakeRecipient("bot"),
         )
         self.sent_messages: list[str] = []
 
@@ -62,32 +83,35 @@ class FakeTurnContext:
 
 
 @unittest.skipIf(N1Bot is None, "Dependências do Bot Framework indisponíveis")
-class BotSessionIntegrationTests(unittest.TestCase):
+class BotSessionIntegrationTests(TempDbTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # um event loop para a classe toda (asyncio.run criaria e destruiria um por turno)
+        cls.loop = asyncio.new_event_loop()
+        # patches do Movidesk/resumo instalados uma vez; os mocks são zerados a cada teste
+        cls.create_ticket_patch = patch("app.bot.create_resolved_movidesk_ticket_from_session", return_value="T-9000")
+        cls.build_summary_patch = patch("app.bot.build_chat_session_summary", return_value="Resumo teste")
+        cls.mock_create_ticket = cls.create_ticket_patch.start()
+        cls.mock_build_summary = cls.build_summary_patch.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.build_summary_patch.stop()
+        cls.create_ticket_patch.stop()
+        cls.loop.run_until_complete(cls.loop.shutdown_default_executor())
+        cls.loop.close()
+        super().tearDownClass()
+
     def setUp(self):
-        fd, path = tempfile.mkstemp(prefix="bot_session_", suffix=".db")
-        os.close(fd)
-        self.temp_db_path = path
-        self.old_db_path = db.DB_PATH
-        db.DB_PATH = self.temp_db_path
-        db.init_db()
+        super().setUp()
+        self.mock_create_ticket.reset_mock()
+        self.mock_build_summary.reset_mock()
         self.conv_state = DummyConversationState()
-        patcher_create = patch("app.bot.create_resolved_movidesk_ticket_from_session", return_value="T-9000")
-        patcher_summary = patch("app.bot.build_chat_session_summary", return_value="Resumo teste")
-        self.mock_create_ticket = patcher_create.start()
-        self.mock_build_summary = patcher_summary.start()
-        self.addCleanup(patcher_create.stop)
-        self.addCleanup(patcher_summary.stop)
         self.bot = N1Bot(conversation_state=self.conv_state)  # type: ignore
 
-    def tearDown(self):
-        db.DB_PATH = self.old_db_path
-        try:
-            os.remove(self.temp_db_path)
-        except OSError:
-            pass
-
     def _run_bot(self, ctx: FakeTurnContext):
-        asyncio.run(self.bot.on_message_activity(ctx))  # type: ignore
+        self.loop.run_until_complete(self.bot.on_message_activity(ctx))  # type: ignore
 
     def test_chat_session_creation_and_updates(self):
         ctx1 = FakeTurnContext("Preciso de ajuda com assinatura", user_id="user-chat")
@@ -111,13 +135,12 @@ class BotSessionIntegrationTests(unittest.TestCase):
             updated_ts = cur.fetchone()[0]
         self.assertNotEqual(updated_ts, first_user_ts)
 
-    def test_chat_session_closes_after_positive_feedback(self):
-        user_id = "user-finish"
-        ctx1 = FakeTurnContext("Ajude com VPN", user_id=user_id, teams_id="teams-user-2")
-        self._run_bot(ctx1)
+    def _start_chat_awaiting_ok(self, user_id: str, teams_id: str) -> int:
+        """Primeiro turno do chat + conversa marcada aguardando "Funcionou?"; devolve o id da sessão."""
+        self._run_bot(FakeTurnContext("Ajude com VPN", user_id=user_id, teams_id=teams_id))
         with db.connect() as conn:
             cur = conn.cursor()
-            cur.execute("SELECT id FROM sessions WHERE teams_user_id=?", ("teams-user-2",))
+            cur.execute("SELECT id FROM sessions WHERE teams_user_id=?", (teams_id,))
             session_id = cur.fetchone()[0]
 
         bucket = self.conv_state.storage.get("conv", {})
@@ -126,19 +149,26 @@ class BotSessionIntegrationTests(unittest.TestCase):
         conv["awaiting_ok"] = True
         conv["session_type"] = "chat_driven"
         conv["session_id"] = session_id
+        return session_id
 
-        ctx2 = FakeTurnContext("Sim", user_id=user_id, teams_id="teams-user-2")
-        self._run_bot(ctx2)
-
-        with db.connect() as conn:
-            cur = conn.cursor()
-            cur.execute("SELECT status, ended_at, movidesk_ticket_id FROM sessions WHERE id=?", (session_id,))
-            status, ended_at, mov_ticket = cur.fetchone()
-        self.assertEqual(status, "encerrada_resolvido")
-        self.assertIsNotNone(ended_at)
-        self.assertEqual(mov_ticket, "T-9000")
-        self.assertTrue(self.mock_create_ticket.called)
-
+    def test_chat_session_closes_after_positive_feedback(self):
+        # mesmo bot/loop/banco para todas as variantes; cada uma só precisa da própria sessão aberta
+        for i, feedback in enumerate(("Sim", "Deu certo", "Funcionou")):
+            with self.subTest(feedback=feedback):
+                self.mock_create_ticket.reset_mock()
+                user_id, teams_id = f"user-finish-{i}", f"teams-user-finish-{i}"
+                session_id = self._start_chat_awaiting_ok(user_id, teams_id)
+
+                self._run_bot(FakeTurnContext(feedback, user_id=user_id, teams_id=teams_id))
+
+                with db.connect() as conn:
+                    cur = conn.cursor()
+                    cur.execute("SELECT status, ended_at, movidesk_ticket_id FROM sessions WHERE id=?", (session_id,))
+                    status, ended_at, mov_ticket = cur.fetchone()
+                self.assertEqual(status, "encerrada_resolvido")
+                self.assertIsNotNone(ended_at)
+                self.assertEqual(mov_ticket, "T-9000")
+                self.assertTrue(self.mock_create_ticket.called)
 
 if __name__ == "__main__":
     unittest.main()
@@ -1,27 +1,11 @@
-import os
-import tempfile
 import unittest
 from datetime import datetime, timedelta, timezone
 
 from app import db
+from tests._base import TempDbTestCase
 
 
-class SessionDbTests(unittest.TestCase):
-    def setUp(self):
-        fd, path = tempfile.mkstemp(prefix="sess_", suffix=".db")
-        os.close(fd)
-        self.temp_db_path = path
-        self.old_db_path = db.DB_PATH
-        db.DB_PATH = self.temp_db_path
-        db.init_db()
-
-    def tearDown(self):
-        db.DB_PATH = self.old_db_path
-        try:
-            os.remove(self.temp_db_path)
-        except OSError:
-            pass
-
+class SessionDbTests(TempDbTestCase):
     def test_create_and_get_active_session(self):
         session_id = db.create_session(
             teams_user_id="teams-user-123",
@@ -0,0 +1,39 @@
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from app import summarizer
+
+
+def _chunk(text):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))])
+
+
+def _client_failing_midway():
+    def create(**kwargs):
+        def stream():
+            yield _chunk("Assunto: VPN")
+            raise RuntimeError("conexão caiu")
+
+        return stream()
+
+    return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+
+class SummarizeConversationTests(unittest.TestCase):
+    def setUp(self):
+        summarizer._SUM_CACHE.clear()
+        self.addCleanup(summarizer._SUM_CACHE.clear)
+        patcher = mock.patch.object(summarizer, "_CLIENT", _client_failing_midway())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_stream_failure_midway_falls_back_to_heuristic(self):
+        transcript = "Usuário: a VPN não conecta.\nAgente: reinicie o cliente da VPN."
+        resumo = summarizer.summarize_conversation(transcript)
+        self.assertEqual(resumo, summarizer._heuristic_summary(transcript))
+        self.assertEqual(len(summarizer._SUM_CACHE), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
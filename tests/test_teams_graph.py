@@ -0,0 +1,72 @@
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from app import teams_graph
+
+EMAIL = "ana@tecnogera.com.br"
+USER = {"id": "u1", "mail": EMAIL, "userPrincipalName": EMAIL, "displayName": "Ana"}
+
+
+def _batch(user_values, apps=None, path_status=404):
+    return {
+        "user": {"status": 200, "body": {"value": user_values}},
+        "path": {"status": path_status, "body": {}},
+        "apps": {"status": 200, "body": {"value": apps or []}},
+    }
+
+
+class UserAndInstallStateTests(unittest.TestCase):
+    def setUp(self):
+        teams_graph.clear_user_cache()
+        self.addCleanup(teams_graph.clear_user_cache)
+        self.lookup = mock.Mock(return_value=dict(USER))
+        for target, value in (
+            ("_token", mock.Mock(return_value="tok")),
+            ("get_user_by_email", self.lookup),
+        ):
+            patcher = mock.patch.object(teams_graph, target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _state(self, batch):
+        with mock.patch.object(teams_graph, "_graph_batch", batch):
+            return teams_graph._user_and_install_state(EMAIL, "app-1")
+
+    def test_batch_without_user_is_final(self):
+        user, installed = self._state(mock.Mock(return_value=_batch([])))
+        self.assertIsNone(user["id"])
+        self.assertIsNone(installed)
+        self.lookup.assert_not_called()
+
+    def test_batch_reports_app_missing(self):
+        user, installed = self._state(mock.Mock(return_value=_batch([USER], apps=[{"teamsApp": {"id": "outro"}}])))
+        self.assertEqual(user["id"], "u1")
+        self.assertIs(installed, False)
+
+    def test_batch_error_falls_back_to_sequential_lookup(self):
+        user, installed = self._state(mock.Mock(side_effect=RuntimeError("timeout")))
+        self.assertEqual(user["id"], "u1")
+        self.assertIsNone(installed)
+        self.lookup.assert_called_once_with(EMAIL)
+
+    def test_known_missing_app_is_installed_without_listing_again(self):
+        calls = []
+
+        def fake_g(method, url, token, **kwargs):
+            calls.append(method)
+            return SimpleNamespace(status_code=201, text="")
+
+        with mock.patch.object(teams_graph, "_get_teams_app_id", return_value="app-1"), \
+                mock.patch.object(teams_graph, "_graph_batch", return_value=_batch([USER])), \
+                mock.patch.object(teams_graph, "_notify_tenant_id", return_value="tenant"), \
+                mock.patch.object(teams_graph, "_g", fake_g), \
+                mock.patch.object(teams_graph, "_INSTALLED", teams_graph.TTLCache(ttl=600.0)):
+            user_id, _, _ = teams_graph._prepare_notify(EMAIL, 1, "Assunto", None)
+
+        self.assertEqual(user_id, "u1")
+        self.assertEqual(calls, ["POST"])
+
+
+if __name__ == "__main__":
+    unittest.main()
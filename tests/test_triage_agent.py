@@ -0,0 +1,75 @@
+import asyncio
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from app.ai import triage_agent
+
+_HIT = {"doc_title": "VPN", "doc_path": "vpn.md", "chunk_text": "1. Abra o cliente\n2. Reconecte"}
+
+
+class _FakeCompletions:
+    def __init__(self):
+        self.calls = []
+
+    async def create(self, **kwargs):
+        self.calls.append(kwargs)
+        content = '{"action": "answer", "message": "Reconecte a VPN.", "checklist": []}'
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+class TriageMessagesTests(unittest.TestCase):
+    def setUp(self):
+        self.completions = _FakeCompletions()
+        for target, value in (
+            ("_CLIENT", object()),
+            ("_ACLIENT", SimpleNamespace(chat=SimpleNamespace(completions=self.completions))),
+            ("classify_intent", mock.Mock(return_value={"intent": "vpn.access", "confidence": 0.9})),
+            ("get_priors", mock.Mock(return_value={})),
+            ("kb_search", mock.Mock(return_value=[_HIT])),
+            ("rerank_with_llm", lambda query, hits: hits),
+        ):
+            patcher = mock.patch.object(triage_agent, target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_kb_context_comes_before_history_and_user_turn_is_last(self):
+        history = [
+            {"role": "user", "text": "A VPN caiu"},
+            {"role": "assistant", "text": "Qual cliente você usa?"},
+            {"role": "user", "text": "FortiClient"},
+        ]
+        ticket = {"id": 7, "subject": "VPN", "first_action_text": "Sem VPN"}
+        out = asyncio.run(triage_agent.atriage_next(history, ticket))
+
+        self.assertEqual(out["best_doc_path"], "vpn.md")
+        msgs = self.completions.calls[0]["messages"]
+        self.assertEqual(msgs[0]["role"], "system")
+        self.assertIn("Ticket #7", msgs[1]["content"])
+        self.assertIn("vpn.access", msgs[2]["content"])
+        self.assertIn("KB (resumos curtos)", msgs[3]["content"])
+        self.assertEqual([m["content"] for m in msgs[4:]], [m["text"] for m in history])
+
+    def test_without_llm_answers_from_kb(self):
+        fallback = {"reply": "Abra o cliente e reconecte.", "sources": [{"title": "VPN"}]}
+        with mock.patch.object(triage_agent, "_CLIENT", None), \
+                mock.patch.object(triage_agent, "kb_try_answer", mock.Mock(return_value=fallback)):
+            out = asyncio.run(triage_agent.atriage_next([{"role": "user", "text": "VPN"}], {"id": 7}))
+
+        self.assertEqual(out["message"], fallback["reply"])
+        self.assertEqual(out["checklist"], ["VPN"])
+        self.assertEqual(self.completions.calls, [])
+
+    def test_without_llm_and_without_hits_skips_kb_fallback(self):
+        try_answer = mock.Mock()
+        with mock.patch.object(triage_agent, "_CLIENT", None), \
+                mock.patch.object(triage_agent, "kb_search", mock.Mock(return_value=[])), \
+                mock.patch.object(triage_agent, "kb_try_answer", try_answer):
+            out = asyncio.run(triage_agent.atriage_next([{"role": "user", "text": "VPN"}], {"id": 7}))
+
+        self.assertEqual(out["action"], "ask")
+        try_answer.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
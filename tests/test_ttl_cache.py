@@ -0,0 +1,41 @@
+import unittest
+from unittest import mock
+
+from app.ttl_cache import TTLCache
+
+
+class TTLCacheTests(unittest.TestCase):
+    def test_expired_entries_are_dropped(self):
+        cache = TTLCache(ttl=10.0, maxsize=4)
+        with mock.patch("app.ttl_cache.time.monotonic", return_value=100.0):
+            cache.set("a", 1)
+            cache.set("b", 2, ttl=50.0)
+        with mock.patch("app.ttl_cache.time.monotonic", return_value=120.0):
+            self.assertIsNone(cache.get("a"))
+            self.assertEqual(cache.get("b"), 2)
+        self.assertEqual(len(cache), 1)
+
+    def test_full_cache_evicts_expired_before_oldest(self):
+        cache = TTLCache(ttl=None, maxsize=2)
+        with mock.patch("app.ttl_cache.time.monotonic", return_value=100.0):
+            cache.set("velho", 1)
+            cache.set("curto", 2, ttl=1.0)
+        with mock.patch("app.ttl_cache.time.monotonic", return_value=200.0):
+            cache.set("novo", 3)
+            self.assertEqual(cache.get("velho"), 1)
+            self.assertIsNone(cache.get("curto"))
+            cache.set("outro", 4)
+            self.assertIsNone(cache.get("velho"))
+            self.assertEqual(cache.get("novo"), 3)
+
+    def test_discard_where(self):
+        cache = TTLCache(ttl=None)
+        cache.set(("u1", "app"), True)
+        cache.set(("u2", "app"), True)
+        cache.discard_where(lambda key: key[0] == "u1")
+        self.assertIsNone(cache.get(("u1", "app")))
+        self.assertTrue(cache.get(("u2", "app")))
+
+
+if __name__ == "__main__":
+    unittest.main()
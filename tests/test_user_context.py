@@ -1,27 +1,10 @@
-import os
-import sqlite3
-import tempfile
 import unittest
 
 from app import db
+from tests._base import TempDbTestCase
 
 
-class UserContextTests(unittest.TestCase):
-    def setUp(self):
-        fd, path = tempfile.mkstemp(prefix="ctx_", suffix=".db")
-        os.close(fd)
-        self.temp_db_path = path
-        self.old_db_path = db.DB_PATH
-        db.DB_PATH = self.temp_db_path
-        db.init_db()
-
-    def tearDown(self):
-        db.DB_PATH = self.old_db_path
-        try:
-            os.remove(self.temp_db_path)
-        except OSError:
-            pass
-
+class UserContextTests(TempDbTestCase):
     def test_set_and_get_user_context(self):
         db.set_user_current_ticket("User@Test.com", 42, teams_user_id="orgid-xyz")
         ctx = db.get_user_context("user@test.com")